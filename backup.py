@@ -0,0 +1,252 @@
+"""Full collection archive backup and restore.
+
+An archive is a single zip bundle holding one CSV file per table (ids
+included), every deck image as its own entry under ``images/`` and a
+``manifest.json`` describing the contents. Table data is streamed with
+COPY and images are read through a server-side cursor, so memory use stays
+bounded regardless of collection size.
+
+Usage:
+    python backup.py backup collection.zip
+    python backup.py restore collection.zip [--replace] [--workers 4]
+"""
+import argparse
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from psycopg2.extras import execute_values
+
+ARCHIVE_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+IMAGE_PREFIX = 'images/'
+STAGING_PREFIX = 'restore_'  # restore loads into restore_<table> before swapping in
+
+# Restore order matters: tables referenced by foreign keys come first.
+ARCHIVE_TABLES = [
+    ('decks', ['id', 'deck_name', 'manufacturer', 'release_year', 'condition',
+               'purchase_date', 'purchase_price', 'notes', 'image_phash', 'image_hash_failed', 'created_at']),
+    ('wishlist', ['id', 'deck_name', 'manufacturer', 'expected_price', 'priority',
+                  'notes', 'created_at']),
+    ('market_values', ['id', 'deck_id', 'market_price', 'source', 'condition',
+                       'updated_at', 'notes']),
+    ('price_alerts', ['id', 'wishlist_id', 'market_value_id', 'market_price', 'expected_price',
+                      'dismissed', 'created_at']),
+    ('shared_collections', ['id', 'share_id', 'name', 'description',
+                            'created_at', 'expires_at', 'is_public']),
+    ('shared_collection_decks', ['collection_id', 'deck_id', 'position']),
+    ('valuation_snapshots', ['scope', 'scope_key', 'snapshot_date', 'deck_count', 'valued_decks',
+                             'cost_basis', 'market_value']),
+]
+
+def backup_collection(db, path, image_batch_size=100):
+    """Write decks, wishlist, market values, price alerts, shares, valuation history and images to a zip archive"""
+    conn = db.new_connection()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    manifest = {
+        'format_version': ARCHIVE_FORMAT_VERSION,
+        'schema_version': db.get_current_schema_version(),
+        'created_at': datetime.now().isoformat(),
+        'tables': {},
+        'images': 0
+    }
+    try:
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for table, columns in ARCHIVE_TABLES:
+                with conn.cursor() as cur, archive.open(f"{table}.csv", 'w', force_zip64=True) as entry:
+                    cur.copy_expert(
+                        f"COPY (SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}) "
+                        f"TO STDOUT WITH (FORMAT csv, HEADER)",
+                        entry
+                    )
+                    manifest['tables'][table] = {'columns': columns, 'rows': cur.rowcount}
+
+            with conn.cursor(name='backup_images') as cur:
+                cur.itersize = image_batch_size
+                cur.execute("SELECT id, image_data FROM decks WHERE image_data IS NOT NULL ORDER BY id")
+                for deck_id, image_data in cur:
+                    image_info = zipfile.ZipInfo(f"{IMAGE_PREFIX}{deck_id}.jpg")
+                    image_info.compress_type = zipfile.ZIP_STORED  # already JPEG-compressed
+                    archive.writestr(image_info, bytes(image_data))
+                    manifest['images'] += 1
+
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+        conn.commit()
+        return manifest
+    except Exception as e:
+        raise Exception(f"Backup failed: {str(e)}")
+    finally:
+        conn.close()
+
+def restore_collection(db, path, replace=False, workers=4, image_batch_size=100):
+    """Restore an archive written by backup_collection, preserving ids and share links.
+
+    Tables and images are first loaded in parallel, each worker on its own
+    connection, into unlogged staging tables. A single transaction then
+    swaps them in: it empties the live tables, fills them from staging and
+    resets the id sequences, so a failure at any point leaves the database
+    as it was. Archives from before shared_collection_decks existed have
+    their deck_ids arrays expanded into it.
+    """
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        image_names = [name for name in archive.namelist() if name.startswith(IMAGE_PREFIX)]
+
+    if manifest['format_version'] != ARCHIVE_FORMAT_VERSION:
+        raise Exception(f"Unsupported archive format version {manifest['format_version']}")
+    if manifest['schema_version'] > db.get_current_schema_version():
+        raise Exception(f"Archive schema version {manifest['schema_version']} is newer than this database")
+
+    # Columns come from the manifest so archives taken on older schemas still load
+    tables = [(table, manifest['tables'][table]['columns']) for table, _ in ARCHIVE_TABLES
+              if table in manifest['tables']]
+
+    conn = db.new_connection()
+    try:
+        with conn.cursor() as cur:
+            if _has_data(cur) and not replace:
+                raise Exception("Target database is not empty; pass replace=True to overwrite it")
+            for table, columns in tables:
+                _create_staging_table(cur, table, columns)
+            cur.execute(f"DROP TABLE IF EXISTS {STAGING_PREFIX}images")
+            cur.execute(f"CREATE UNLOGGED TABLE {STAGING_PREFIX}images (id INTEGER, image_data BYTEA)")
+        conn.commit()
+
+        jobs = [(_stage_table, (db, path, table, columns)) for table, columns in tables]
+        jobs += [(_stage_images, (db, path, image_names[i::workers], image_batch_size))
+                 for i in range(workers) if image_names[i::workers]]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(job, *args) for job, args in jobs]
+            for future in futures:
+                future.result()
+
+        with conn.cursor() as cur:
+            if _has_data(cur):
+                if not replace:
+                    raise Exception("Target database is not empty; pass replace=True to overwrite it")
+                cur.execute(f"TRUNCATE {', '.join(table for table, _ in ARCHIVE_TABLES)} RESTART IDENTITY CASCADE")
+            for table, columns in tables:
+                _swap_in_table(cur, table, columns)
+            # Watermarks describe the replaced data; without them the next
+            # alert match rescans every restored market value
+            cur.execute("DELETE FROM job_watermarks")
+            for table, columns in ARCHIVE_TABLES:
+                if 'id' not in columns:
+                    continue
+                cur.execute(f"""
+                    SELECT setval(pg_get_serial_sequence('{table}', 'id'),
+                                  COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+                    FROM {table}
+                """)
+            _drop_staging_tables(cur)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        try:
+            with conn.cursor() as cur:
+                _drop_staging_tables(cur)
+            conn.commit()
+        except Exception:
+            pass  # the next restore drops leftover staging tables before loading
+        raise Exception(f"Restore failed: {str(e)}")
+    finally:
+        conn.close()
+
+    db.image_hash_version += 1
+    return manifest
+
+def _has_data(cur):
+    cur.execute("SELECT EXISTS (SELECT 1 FROM decks) OR EXISTS (SELECT 1 FROM wishlist)")
+    return cur.fetchone()[0]
+
+def _create_staging_table(cur, table, columns):
+    """Unlogged, constraint-free copy of the archive's columns of table"""
+    # deck_ids only exists in archives from before shared_collection_decks
+    select_list = ', '.join('NULL::integer[] AS deck_ids' if column == 'deck_ids' else column
+                            for column in columns)
+    cur.execute(f"DROP TABLE IF EXISTS {STAGING_PREFIX}{table}")
+    cur.execute(f"CREATE UNLOGGED TABLE {STAGING_PREFIX}{table} AS SELECT {select_list} FROM {table} WITH NO DATA")
+
+def _drop_staging_tables(cur):
+    for table, _ in ARCHIVE_TABLES:
+        cur.execute(f"DROP TABLE IF EXISTS {STAGING_PREFIX}{table}")
+    cur.execute(f"DROP TABLE IF EXISTS {STAGING_PREFIX}images")
+
+def _stage_table(db, path, table, columns):
+    conn = db.new_connection()
+    try:
+        with conn.cursor() as cur, zipfile.ZipFile(path) as archive, archive.open(f"{table}.csv") as entry:
+            cur.copy_expert(
+                f"COPY {STAGING_PREFIX}{table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, HEADER)",
+                entry
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise Exception(f"Failed to load {table}: {str(e)}")
+    finally:
+        conn.close()
+
+def _stage_images(db, path, image_names, batch_size):
+    conn = db.new_connection()
+    try:
+        with conn.cursor() as cur, zipfile.ZipFile(path) as archive:
+            for start in range(0, len(image_names), batch_size):
+                images = [(int(name[len(IMAGE_PREFIX):].split('.', 1)[0]), archive.read(name))
+                          for name in image_names[start:start + batch_size]]
+                execute_values(cur, f"INSERT INTO {STAGING_PREFIX}images (id, image_data) VALUES %s",
+                               images, template="(%s, %s::bytea)", page_size=len(images))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise Exception(f"Failed to load images: {str(e)}")
+    finally:
+        conn.close()
+
+def _swap_in_table(cur, table, columns):
+    """Fill table from its staging table; runs inside the restore transaction"""
+    staging = f"{STAGING_PREFIX}{table}"
+    if table == 'decks':
+        cur.execute(f"""
+            INSERT INTO decks ({', '.join(columns)}, image_data)
+            SELECT {', '.join(f's.{column}' for column in columns)}, i.image_data
+            FROM {staging} s LEFT JOIN {STAGING_PREFIX}images i ON i.id = s.id
+        """)
+    elif table == 'shared_collections' and 'deck_ids' in columns:
+        share_columns = ', '.join(column for column in columns if column != 'deck_ids')
+        cur.execute(f"INSERT INTO shared_collections ({share_columns}) SELECT {share_columns} FROM {staging}")
+        cur.execute(f"""
+            INSERT INTO shared_collection_decks (collection_id, deck_id, position)
+            SELECT s.id, t.deck_id, t.position
+            FROM {staging} s,
+                 unnest(s.deck_ids) WITH ORDINALITY AS t(deck_id, position)
+            WHERE EXISTS (SELECT 1 FROM decks d WHERE d.id = t.deck_id)
+        """)
+    else:
+        cur.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {staging}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up or restore the full card collection")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backup_parser = subparsers.add_parser('backup', help="Write the collection to an archive")
+    backup_parser.add_argument('path')
+
+    restore_parser = subparsers.add_parser('restore', help="Load the collection from an archive")
+    restore_parser.add_argument('path')
+    restore_parser.add_argument('--replace', action='store_true', help="Overwrite existing data")
+    restore_parser.add_argument('--workers', type=int, default=4)
+
+    args = parser.parse_args()
+
+    from database import db
+
+    if args.command == 'backup':
+        manifest = backup_collection(db, args.path)
+        print(f"Backed up {manifest['tables']['decks']['rows']} decks and {manifest['images']} images to {args.path}")
+    else:
+        manifest = restore_collection(db, args.path, replace=args.replace, workers=args.workers)
+        print(f"Restored {manifest['tables']['decks']['rows']} decks and {manifest['images']} images from {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Database benchmark suite.
+
+Seeds the configured Postgres (PG* env vars) with a synthetic collection and
+times every Database read path plus bulk imports, reporting p50/p95/p99
+latency and peak Python memory per method. Results can be stored as a
+baseline and later runs compared against it to catch regressions.
+
+WARNING: seeding truncates the collection tables, so only point this at a
+local benchmark database.
+
+Usage:
+    python benchmark.py --scale 1k --save-baseline
+    python benchmark.py --scale 100k --compare
+    python benchmark.py --scale 1m --skip-seed --repeat 5
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+REGRESSION_TOLERANCE = 0.25  # allowed p95 slowdown before a method counts as regressed
+IMAGE_SHARE = 10  # one deck in IMAGE_SHARE gets an image
+IMAGE_COUNT = 8  # distinct synthetic images cycled through the decks that get one
+SNAPSHOT_DAYS = 5 * 365  # daily valuation history per scope
+BULK_IMPORT_ROWS = 1000
+
+MANUFACTURERS = ["Bicycle", "Theory11", "Ellusionist", "Art of Play", "Fournier", "Copag",
+                 "Kings Wild", "Fontaine", "Dan & Dave", "Cartamundi", "US Playing Card Co", "Piatnik"]
+CONDITIONS = ["Mint", "Near Mint", "Excellent", "Good", "Fair", "Poor"]
+SOURCES = ["eBay", "CardMarket", "Portfolio52", "Other"]
+NAME_WORDS = ["Royal", "Black", "Gold", "Vintage", "Monarch", "Tycoon", "Ghost", "Rider",
+              "Red", "Blue", "Artisan", "Jerry's", "Nugget", "Club", "Edition", "Limited",
+              "Midnight", "Emerald", "Crown", "Legacy", "Classic", "Steampunk", "Cardistry"]
+
+def generate_collection(n_decks, seed=42):
+    """Build a reproducible synthetic collection as DataFrames keyed by table"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n_decks + 1)
+
+    words = np.array(NAME_WORDS)
+    deck_names = pd.Series(words[rng.integers(0, len(words), n_decks)]).str.cat(
+        [pd.Series(words[rng.integers(0, len(words), n_decks)]), pd.Series(ids % 997).astype(str)], sep=' '
+    )
+    purchase_dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24, n_decks), unit='D')
+    decks = pd.DataFrame({
+        'deck_name': deck_names,
+        'manufacturer': np.array(MANUFACTURERS)[rng.integers(0, len(MANUFACTURERS), n_decks)],
+        'release_year': rng.integers(1950, 2024, n_decks),
+        'condition': np.array(CONDITIONS)[rng.integers(0, len(CONDITIONS), n_decks)],
+        'purchase_date': purchase_dates,
+        'purchase_price': np.round(rng.lognormal(3, 0.8, n_decks), 2),
+        'notes': np.where(rng.random(n_decks) < 0.3, "Sealed, from a collector auction", ''),
+    })
+
+    # One to four sources per deck; (deck_id, source) must stay unique
+    source_counts = rng.integers(1, len(SOURCES) + 1, n_decks)
+    value_deck_ids = np.repeat(ids, source_counts)
+    source_index = np.concatenate([np.arange(count) for count in source_counts])
+    market_values = pd.DataFrame({
+        'deck_id': value_deck_ids,
+        'market_price': np.round(decks['purchase_price'].to_numpy()[value_deck_ids - 1]
+                                 * rng.uniform(0.6, 2.5, len(value_deck_ids)), 2),
+        'source': np.array(SOURCES)[source_index],
+        'condition': np.array(CONDITIONS)[rng.integers(0, len(CONDITIONS), len(value_deck_ids))],
+        'updated_at': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, len(value_deck_ids)), unit='min'),
+        'notes': '',
+    })
+
+    n_wishlist = max(n_decks // 10, 1)
+    wishlist = pd.DataFrame({
+        'deck_name': deck_names.sample(n_wishlist, replace=True, random_state=seed).to_numpy(),
+        'manufacturer': np.array(MANUFACTURERS)[rng.integers(0, len(MANUFACTURERS), n_wishlist)],
+        'expected_price': np.round(rng.lognormal(3, 0.8, n_wishlist), 2),
+        'priority': rng.integers(1, 6, n_wishlist),
+        'notes': '',
+    })
+
+    n_shares = max(n_decks // 100, 1)
+    share_ids = np.arange(1, n_shares + 1)
+    shared_collections = pd.DataFrame({
+        'id': share_ids,
+        'name': [f"Share {i}" for i in range(n_shares)],
+        'description': "Synthetic benchmark share",
+        'is_public': rng.random(n_shares) < 0.5,
+    })
+    share_sizes = np.minimum(rng.integers(5, 50, n_shares), n_decks)
+    shared_collection_decks = pd.DataFrame({
+        'collection_id': np.repeat(share_ids, share_sizes),
+        'deck_id': np.concatenate([rng.choice(ids, size, replace=False) for size in share_sizes]),
+        'position': np.concatenate([np.arange(1, size + 1) for size in share_sizes]),
+    })
+
+    # Daily valuations as a random walk, for the whole collection and each manufacturer
+    snapshot_dates = pd.date_range(end='2024-12-31', periods=SNAPSHOT_DAYS, freq='D')
+    scopes = [('collection', '')] + [('manufacturer', name) for name in MANUFACTURERS]
+    cost_basis = decks.groupby('manufacturer')['purchase_price'].sum()
+    scope_costs = [cost_basis.sum()] + [cost_basis.get(name, 0.0) for name in MANUFACTURERS]
+    scope_counts = [n_decks] + [int((decks['manufacturer'] == name).sum()) for name in MANUFACTURERS]
+    growth = np.exp(np.cumsum(rng.normal(0.0003, 0.01, (len(scopes), SNAPSHOT_DAYS)), axis=1))
+    valuation_snapshots = pd.DataFrame({
+        'scope': np.repeat([scope for scope, _ in scopes], SNAPSHOT_DAYS),
+        'scope_key': np.repeat([key for _, key in scopes], SNAPSHOT_DAYS),
+        'snapshot_date': np.tile(snapshot_dates.date, len(scopes)),
+        'deck_count': np.repeat(scope_counts, SNAPSHOT_DAYS),
+        'valued_decks': np.repeat(scope_counts, SNAPSHOT_DAYS),
+        'cost_basis': np.round(np.repeat(scope_costs, SNAPSHOT_DAYS), 2),
+        'market_value': np.round((np.array(scope_costs)[:, None] * growth).ravel(), 2),
+    })
+
+    return {
+        'decks': decks,
+        'market_values': market_values,
+        'wishlist': wishlist,
+        'shared_collections': shared_collections,
+        'shared_collection_decks': shared_collection_decks,
+        'valuation_snapshots': valuation_snapshots,
+    }
+
+def generate_images(count=IMAGE_COUNT, seed=42):
+    """Small JPEG images in the same format validate_image produces"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, (400, 280, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels, 'RGB').save(buffer, format='JPEG', quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+def seed_database(db, n_decks, seed=42):
+    """Replace the collection tables with a synthetic collection of n_decks decks"""
+    tables = generate_collection(n_decks, seed)
+    images = generate_images(seed=seed)
+    conn = db.conn
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE decks, wishlist, market_values, shared_collections, valuation_snapshots "
+                    "RESTART IDENTITY CASCADE")
+        conn.commit()
+    db.bulk_add_decks(tables['decks'])
+    with conn.cursor() as cur:
+        db._use_bulk_timeout(cur)
+        for table in ('market_values', 'wishlist', 'shared_collections', 'shared_collection_decks',
+                      'valuation_snapshots'):
+            buffer = io.StringIO()
+            tables[table].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            # The collection-wide snapshot rows have an empty, not NULL, scope_key
+            options = ", FORCE_NOT_NULL (scope_key)" if table == 'valuation_snapshots' else ""
+            cur.copy_expert(
+                f"COPY {table} ({', '.join(tables[table].columns)}) FROM STDIN WITH (FORMAT csv{options})",
+                buffer
+            )
+        for index, image in enumerate(images):
+            cur.execute(
+                "UPDATE decks SET image_data = %s WHERE id %% %s = %s",
+                (image, IMAGE_SHARE * len(images), index)
+            )
+        cur.execute("SELECT setval(pg_get_serial_sequence('shared_collections', 'id'), %s)", (len(tables['shared_collections']),))
+        cur.execute("ANALYZE")
+        conn.commit()
+
+def benchmark_cases(db, seed=42):
+    """Named zero-argument callables covering the Database surface"""
+    rng = np.random.default_rng(seed)
+    with db.conn.cursor() as cur:
+        cur.execute("SELECT MAX(id) FROM decks")
+        max_deck_id = cur.fetchone()[0] or 1
+        cur.execute("SELECT share_id FROM shared_collections ORDER BY id LIMIT 1")
+        row = cur.fetchone()
+        share_id = row[0] if row else None
+    db.conn.commit()
+
+    import_rows = generate_collection(BULK_IMPORT_ROWS, seed + 1)['decks']
+    # seed_database stores image `index` on ids where id % (IMAGE_SHARE * IMAGE_COUNT) == index
+    image_period = IMAGE_SHARE * IMAGE_COUNT
+    image_ids = [base + index for base in range(0, max_deck_id + 1, image_period)
+                 for index in range(IMAGE_COUNT) if 0 < base + index <= max_deck_id] or [1]
+
+    def bulk_import():
+        db.bulk_add_decks(import_rows)
+        with db.conn.cursor() as cur:
+            cur.execute("DELETE FROM decks WHERE id > %s", (max_deck_id,))
+        db.conn.commit()
+
+    return {
+        'get_all_decks': db.get_all_decks,
+        'iter_decks': lambda: sum(len(chunk) for chunk in db.iter_decks()),
+        'get_wishlist': db.get_wishlist,
+        'search_decks': lambda: db.search_decks(NAME_WORDS[int(rng.integers(0, len(NAME_WORDS)))]),
+        'get_market_values': db.get_market_values,
+        'get_market_values(deck_id)': lambda: db.get_market_values(int(rng.integers(1, max_deck_id + 1))),
+        'get_deck_image': lambda: db.get_deck_image(image_ids[int(rng.integers(0, len(image_ids)))]),
+        'get_shared_collection': lambda: db.get_shared_collection(share_id),
+        'get_shared_collection(page)': lambda: db.get_shared_collection(share_id, limit=50),
+        'get_shares_for_decks': lambda: db.get_shares_for_decks(rng.integers(1, max_deck_id + 1, 20).tolist()),
+        'get_active_shared_collections': db.get_active_shared_collections,
+        'get_valuation_history': db.get_valuation_history,
+        'get_valuation_history(manufacturer)': lambda: db.get_valuation_history(
+            MANUFACTURERS[int(rng.integers(0, len(MANUFACTURERS)))]),
+        f'bulk_add_decks({BULK_IMPORT_ROWS})': bulk_import,
+    }
+
+def run_case(func, repeat):
+    """Time func `repeat` times, then measure peak traced memory of one extra call"""
+    func()  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+            'peak_mb': round(peak / (1024 * 1024), 3)}
+
+def check_slow_query_logging(db):
+    """Force an execute_values statement down the slow-query path.
+
+    execute_values hands the cursor an already-mogrified bytes query; the
+    slow-query log must neither fail on it nor record its inlined values.
+    Returns a list of problems (empty when the check passes).
+    """
+    from psycopg2.extras import execute_values
+    from instrumentation import query_stats
+
+    marker = 'slow-query-check-value'
+    threshold = query_stats.slow_query_ms
+    query_stats.slow_query_ms = 0
+    try:
+        with db.conn.cursor() as cur:
+            execute_values(cur, """
+                UPDATE decks SET notes = decks.notes
+                FROM (VALUES %s) AS v(id, marker)
+                WHERE decks.id = v.id
+            """, [(1, marker)])
+    except Exception as e:
+        return [f"execute_values failed on the slow-query path: {str(e)}"]
+    finally:
+        query_stats.slow_query_ms = threshold
+        db.conn.rollback()
+    logged = query_stats.slow_queries[-1]['sql'] if query_stats.slow_queries else ''
+    return [f"slow-query log recorded an inlined value: {logged}"] if marker in logged else []
+
+def compare_to_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Return a list of human-readable regressions against the stored baseline"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if result['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f}ms vs baseline {reference['p95_ms']:.1f}ms")
+        if result['peak_mb'] > reference['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {result['peak_mb']:.1f}MB vs baseline {reference['peak_mb']:.1f}MB")
+    return regressions
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Database class against a synthetic collection")
+    parser.add_argument('--scale', choices=SCALES.keys(), default='1k')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true', help="Reuse the data already in the database")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help="Fail when results regress against the baseline")
+    args = parser.parse_args()
+
+    from database import db
+
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed_database(db, SCALES[args.scale], args.seed)
+        print(f"Seeded {SCALES[args.scale]:,} decks in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    print(f"{'method':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>10}")
+    for name, func in benchmark_cases(db, args.seed).items():
+        results[name] = run_case(func, args.repeat)
+        r = results[name]
+        print(f"{name:<36}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['peak_mb']:>10.2f}")
+
+    problems = check_slow_query_logging(db)
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+
+    baselines = load_baselines()
+    if args.save_baseline:
+        baselines[args.scale] = results
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for scale {args.scale} to {BASELINE_PATH}")
+
+    if args.compare:
+        if args.scale not in baselines:
+            print(f"No baseline stored for scale {args.scale}")
+            sys.exit(1)
+        regressions = compare_to_baseline(results, baselines[args.scale])
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Server-side chart data reduction.
+
+Charts are built from already-aggregated frames so the Plotly payload sent
+to the browser has a fixed size however large the collection grows:
+
+* ``top_n`` keeps the largest categories and folds the rest into "Other";
+* ``binned_histogram`` counts values into a fixed number of bins;
+* ``downsample_series`` thins a time series with Largest-Triangle-Three-
+  Buckets (LTTB), which keeps the visual shape, and the result is drawn
+  with WebGL (``go.Scattergl``).
+"""
+import numpy as np
+import pandas as pd
+
+TOP_N = 10
+OTHER_LABEL = "Other"
+HISTOGRAM_BINS = 30
+MAX_SERIES_POINTS = 1000
+
+def top_n(df, category, value=None, n=TOP_N, other=True):
+    """The n largest categories by summed value (or row count), plus an "Other" row.
+
+    Returns a frame with the category column and a ``value`` column, largest first.
+    """
+    grouped = df.groupby(category, observed=True)
+    totals = (grouped[value].sum() if value else grouped.size()).sort_values(ascending=False)
+    top = totals.iloc[:n]
+    if other and len(totals) > n:
+        top = pd.concat([top.astype(float), pd.Series({OTHER_LABEL: float(totals.iloc[n:].sum())})])
+    top.index = top.index.astype(str)
+    return top.rename_axis(category).reset_index(name='value')
+
+def binned_histogram(values, bins=HISTOGRAM_BINS):
+    """Counts of values in equal-width bins, with bin edges and a readable label"""
+    values = pd.Series(values).dropna().to_numpy(dtype=float)
+    if not len(values):
+        return pd.DataFrame(columns=['bin_start', 'bin_end', 'label', 'count'])
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({
+        'bin_start': edges[:-1],
+        'bin_end': edges[1:],
+        'label': [f"{start:,.2f}–{end:,.2f}" for start, end in zip(edges[:-1], edges[1:])],
+        'count': counts
+    })
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets decimation.
+
+    x must be sorted ascending. The first and last points are always kept;
+    every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        a = kept[i]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        kept[i + 1] = start + int(area.argmax())
+    kept[-1] = n - 1
+    return kept
+
+def downsample_series(df, x, y, max_points=MAX_SERIES_POINTS):
+    """df sorted by x and thinned to at most max_points rows with LTTB"""
+    df = df.dropna(subset=[x, y]).sort_values(x)
+    if len(df) <= max_points:
+        return df
+    x_values = df[x]
+    if pd.api.types.is_datetime64_any_dtype(x_values):
+        x_values = x_values.astype('int64')
+    return df.iloc[lttb(x_values.to_numpy(), df[y].to_numpy(), max_points)]
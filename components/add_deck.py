@@ -1,6 +1,8 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 from database import db
+from components.fragments import rerun_fragment
 from utils import validate_image, validate_deck_data
 
 def render_add_deck():
@@ -10,90 +12,145 @@ def render_add_deck():
     tab1, tab2 = st.tabs(["Add Single Deck", "Bulk Import"])
     
     with tab1:
-        with st.form("add_deck_form"):
-            deck_name = st.text_input("Deck Name*", key="deck_name")
-            manufacturer = st.text_input("Manufacturer*", key="manufacturer")
-            release_year = st.number_input("Release Year", 
-                                       min_value=1800, 
-                                       max_value=datetime.now().year,
-                                       value=datetime.now().year)
-            
-            condition = st.selectbox("Condition", 
-                                 ["Mint", "Near Mint", "Excellent", "Good", "Fair", "Poor"])
-            
-            purchase_date = st.date_input("Purchase Date")
-            purchase_price = st.number_input("Purchase Price ($)", 
-                                         min_value=0.0, 
-                                         step=0.01)
-            
-            notes = st.text_area("Notes")
-            image_file = st.file_uploader("Deck Image", type=['png', 'jpg', 'jpeg'])
-            
-            submit = st.form_submit_button("Add Deck")
-            
-            if submit:
-                if not deck_name or not manufacturer:
-                    st.error("Deck name and manufacturer are required!")
-                    return
-                
-                deck_data = {
-                    'deck_name': deck_name,
-                    'manufacturer': manufacturer,
-                    'release_year': release_year,
-                    'condition': condition,
-                    'purchase_date': purchase_date,
-                    'purchase_price': purchase_price,
-                    'notes': notes
-                }
-                
-                # Validate deck data
-                validation_errors = validate_deck_data(deck_data)
-                if validation_errors:
-                    for error in validation_errors:
-                        st.error(error)
-                    return
-                
-                # Process image if provided
-                image_data = None
-                if image_file:
-                    image_data, error = validate_image(image_file)
-                    if error:
-                        st.error(f"Image error: {error}")
-                        return
-                
-                try:
-                    db.add_deck(deck_data, image_data)
-                    st.success("Deck added successfully!")
-                    st.session_state.clear()
-                except Exception as e:
-                    st.error(f"Error adding deck: {str(e)}")
+        render_add_deck_form()
     
     with tab2:
-        st.write("Upload a CSV file with deck information")
+        st.write("Upload a CSV, Parquet or Arrow (Feather) file with deck information")
         st.write("Required columns: deck_name, manufacturer, release_year, condition, purchase_date (YYYY-MM-DD), purchase_price")
         st.write("Optional columns: notes")
         
-        csv_file = st.file_uploader("Upload CSV", type=['csv'])
+        import_file = st.file_uploader("Upload File", type=['csv', 'parquet', 'arrow', 'feather'])
         
-        if csv_file:
-            from utils import parse_bulk_import_data
+        if import_file:
+            from utils import parse_bulk_import_data, parse_columnar_import_data
             
-            decks, errors = parse_bulk_import_data(csv_file)
+            file_format = import_file.name.rsplit('.', 1)[-1].lower()
+            if file_format == 'csv':
+                decks, errors = parse_bulk_import_data(import_file)
+                decks = pd.DataFrame(decks)
+            else:
+                decks, errors = parse_columnar_import_data(import_file, file_format)
             
             if errors:
-                st.error("Errors found in CSV file:")
+                st.error("Errors found in import file:")
                 for error in errors:
                     st.error(error)
             
-            if decks:
-                if st.button(f"Import {len(decks)} Decks"):
-                    success_count = 0
-                    for deck in decks:
-                        try:
-                            db.add_deck(deck)
-                            success_count += 1
-                        except Exception as e:
-                            st.error(f"Error adding deck {deck['deck_name']}: {str(e)}")
+            if not decks.empty:
+                from dedupe import find_duplicates, summarize_duplicates, drop_duplicates
+                
+                # Duplicate analysis is the slow part, so run it once per uploaded file
+                dedupe_key = f"dedupe_{import_file.file_id}"
+                if dedupe_key not in st.session_state:
+                    st.session_state[dedupe_key] = find_duplicates(decks, db.get_deck_identities())
+                duplicates = st.session_state[dedupe_key]
+                
+                if not duplicates.empty:
+                    summary = summarize_duplicates(duplicates, len(decks))
+                    st.warning(f"Found {len(duplicates)} possible duplicate rows")
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Exact (in file)", summary['exact_in_file'])
+                    with col2:
+                        st.metric("Exact (in collection)", summary['exact_in_collection'])
+                    with col3:
+                        st.metric("Near (in file)", summary['near_in_file'])
+                    with col4:
+                        st.metric("Near (in collection)", summary['near_in_collection'])
+                    
+                    with st.expander("Review duplicates"):
+                        st.dataframe(duplicates, hide_index=True)
                     
-                    if success_count > 0:
-                        st.success(f"Successfully imported {success_count} decks!")
+                    skip_exact = st.checkbox("Skip exact duplicates", value=True)
+                    skip_near = st.checkbox("Skip near duplicates", value=False,
+                                            help="In-file duplicates keep their first occurrence")
+                    decks = drop_duplicates(decks, duplicates, skip_exact=skip_exact, skip_near=skip_near)
+                
+                if not decks.empty and st.button(f"Import {len(decks)} Decks"):
+                    try:
+                        imported_count = db.bulk_add_decks(decks)
+                        # The check ran against the collection before this import; redo it if clicked again
+                        del st.session_state[dedupe_key]
+                        st.success(f"Successfully imported {imported_count} decks!")
+                    except Exception as e:
+                        st.error(f"Error importing decks: {str(e)}")
+
+@st.fragment
+def render_add_deck_form():
+    """Single-deck form; submitting it reruns only this fragment"""
+    # A new form key after a successful add starts the form empty; failed
+    # submits keep the input for correction
+    version = st.session_state.setdefault("add_deck_form_version", 0)
+    for level, message in st.session_state.pop("add_deck_notices", []):
+        getattr(st, level)(message)
+    
+    with st.form(f"add_deck_form_{version}"):
+        deck_name = st.text_input("Deck Name*")
+        manufacturer = st.text_input("Manufacturer*")
+        release_year = st.number_input("Release Year", 
+                                   min_value=1800, 
+                                   max_value=datetime.now().year,
+                                   value=datetime.now().year)
+        
+        condition = st.selectbox("Condition", 
+                             ["Mint", "Near Mint", "Excellent", "Good", "Fair", "Poor"])
+        
+        purchase_date = st.date_input("Purchase Date")
+        purchase_price = st.number_input("Purchase Price ($)", 
+                                     min_value=0.0, 
+                                     step=0.01)
+        
+        notes = st.text_area("Notes")
+        image_file = st.file_uploader("Deck Image", type=['png', 'jpg', 'jpeg'])
+        
+        submit = st.form_submit_button("Add Deck")
+        
+        if submit:
+            if not deck_name or not manufacturer:
+                st.error("Deck name and manufacturer are required!")
+                return
+            
+            deck_data = {
+                'deck_name': deck_name,
+                'manufacturer': manufacturer,
+                'release_year': release_year,
+                'condition': condition,
+                'purchase_date': purchase_date,
+                'purchase_price': purchase_price,
+                'notes': notes
+            }
+            
+            # Validate deck data
+            validation_errors = validate_deck_data(deck_data)
+            if validation_errors:
+                for error in validation_errors:
+                    st.error(error)
+                return
+            
+            # Process image if provided
+            image_data = None
+            if image_file:
+                image_data, error = validate_image(image_file)
+                if error:
+                    st.error(f"Image error: {error}")
+                    return
+            
+            notices = []
+            if image_data:
+                from image_index import find_similar_decks, DUPLICATE_DISTANCE
+                
+                lookalikes = find_similar_decks(db, image_data, max_distance=DUPLICATE_DISTANCE, limit=3)
+                for deck in db.get_decks_by_ids([deck_id for deck_id, _ in lookalikes]):
+                    notices.append(('warning', f"This image looks like the one for {deck['deck_name']} - {deck['manufacturer']}"))
+            
+            try:
+                db.add_deck(deck_data, image_data)
+            except Exception as e:
+                for level, message in notices:
+                    getattr(st, level)(message)
+                st.error(f"Error adding deck: {str(e)}")
+                return
+            
+            st.session_state["add_deck_form_version"] = version + 1
+            st.session_state["add_deck_notices"] = notices + [('success', "Deck added successfully!")]
+            rerun_fragment()
@@ -0,0 +1,10 @@
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+def rerun_fragment():
+    """Rerun just the calling fragment, or the whole app when this run was not a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # The fragment ran as part of a full run (e.g. the first render, or AppTest)
+        st.rerun()
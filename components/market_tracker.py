@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from database import db
+from chart_data import TOP_N
+
+HISTORY_PICKER_LIMIT = 50  # decks offered by the history picker at once
 
 def render_market_tracker():
     st.header("Market Value Tracker")
     
-    # Get all decks for selection
-    decks_df = db.get_all_decks()
+    # Decks for selection and recorded market values are independent; fetch them together
+    try:
+        decks_df, market_values_df = db.run_parallel(db.get_all_decks, db.get_market_values)
+    except Exception as e:
+        st.error(f"Error loading market values: {str(e)}")
+        return
     
     if decks_df.empty:
         st.info("Add some decks to start tracking market values!")
@@ -17,10 +25,11 @@ def render_market_tracker():
     with st.expander("Update Market Value", expanded=False):
         with st.form("market_value_form"):
             # Select deck
+            deck_labels = (decks_df['deck_name'] + ' - ' + decks_df['manufacturer'].astype(str)).to_dict()
             selected_deck = st.selectbox(
                 "Select Deck",
                 options=decks_df.index,
-                format_func=lambda x: f"{decks_df.loc[x, 'deck_name']} - {decks_df.loc[x, 'manufacturer']}"
+                format_func=deck_labels.get
             )
             
             # Market value details
@@ -49,13 +58,16 @@ def render_market_tracker():
                     
                     db.update_market_value(decks_df.loc[selected_deck, 'id'], market_data)
                     st.success("Market value updated successfully!")
+                    market_values_df = db.get_market_values()
+                    
+                    alert_count = db.match_price_alerts()
+                    if alert_count:
+                        st.info(f"{alert_count} wishlist price alert(s) triggered!")
                 except Exception as e:
                     st.error(f"Error updating market value: {str(e)}")
     
     # Display market values and analytics
     try:
-        market_values_df = db.get_market_values()
-        
         if not market_values_df.empty:
             # Overview metrics
             col1, col2, col3 = st.columns(3)
@@ -74,11 +86,12 @@ def render_market_tracker():
             # Market value trends
             st.subheader("Market Value Trends")
             
-            # Group by deck and get latest market values
+            # Group by deck and get latest market values; chart only the most valuable decks
             latest_values = market_values_df.sort_values('updated_at').groupby('deck_id').last()
+            top_values = latest_values.nlargest(TOP_N, 'market_price')
             
             fig = px.bar(
-                latest_values,
+                top_values,
                 x='deck_name',
                 y=['market_price', 'purchase_price'],
                 title='Current Market Value vs Purchase Price',
@@ -90,41 +103,66 @@ def render_market_tracker():
                 }
             )
             st.plotly_chart(fig)
+            if len(latest_values) > TOP_N:
+                st.caption(f"Showing the {TOP_N} most valuable of {len(latest_values)} tracked decks")
             
-            # Detailed market value history
-            st.subheader("Market Value History")
-            for deck_id in market_values_df['deck_id'].unique():
-                deck_data = market_values_df[market_values_df['deck_id'] == deck_id].iloc[0]
-                
-                with st.expander(f"{deck_data['deck_name']} - {deck_data['manufacturer']}"):
-                    deck_history = market_values_df[market_values_df['deck_id'] == deck_id].sort_values('updated_at')
-                    
-                    # Price history chart
-                    fig = px.line(
-                        deck_history,
-                        x='updated_at',
-                        y='market_price',
-                        title='Price History',
-                        labels={
-                            'updated_at': 'Date',
-                            'market_price': 'Market Price ($)'
-                        }
-                    )
-                    st.plotly_chart(fig)
-                    
-                    # History table
-                    st.dataframe(
-                        deck_history[['updated_at', 'market_price', 'source', 'condition', 'notes']],
-                        column_config={
-                            'updated_at': st.column_config.DatetimeColumn('Date'),
-                            'market_price': st.column_config.NumberColumn('Market Price', format='$%.2f'),
-                            'source': 'Source',
-                            'condition': 'Condition',
-                            'notes': 'Notes'
-                        }
-                    )
+            # Detailed market value history, one deck at a time
+            render_value_history(market_values_df, latest_values)
         else:
             st.info("No market values recorded yet. Use the form above to start tracking market values!")
             
     except Exception as e:
         st.error(f"Error loading market values: {str(e)}")
+
+@st.fragment
+def render_value_history(market_values_df, latest_values):
+    """Per-deck price history; searching or picking another deck reruns only this fragment"""
+    st.subheader("Market Value History")
+    history_labels = latest_values['deck_name'] + ' - ' + latest_values['manufacturer'].astype(str)
+    
+    # Search narrows the picker so it never lists every tracked deck; the most valuable come first
+    search = st.text_input("Find Deck", key="market_history_search",
+                           help="Filter tracked decks by name or manufacturer")
+    matches = latest_values.index[history_labels.str.contains(search, case=False, regex=False, na=False)] \
+        if search else latest_values.index
+    if matches.empty:
+        st.info("No tracked decks match your search.")
+        return
+    options = latest_values.loc[matches, 'market_price'].nlargest(HISTORY_PICKER_LIMIT).index
+    deck_id = st.selectbox(
+        "Select Deck",
+        options=options,
+        format_func=history_labels.to_dict().get,
+        key="market_history_deck"
+    )
+    if len(matches) > len(options):
+        st.caption(f"Showing the {len(options)} most valuable of {len(matches)} matching decks; search to narrow the list")
+    
+    # market_values holds one row per source for a deck, so the history is a handful of points
+    deck_history = market_values_df[market_values_df['deck_id'] == deck_id].sort_values('updated_at')
+    
+    # Price history chart
+    fig = go.Figure(go.Scatter(
+        x=deck_history['updated_at'],
+        y=deck_history['market_price'],
+        mode='lines+markers'
+    ))
+    fig.update_layout(
+        title='Price History',
+        xaxis_title='Date',
+        yaxis_title='Market Price ($)'
+    )
+    st.plotly_chart(fig)
+    
+    # History table
+    st.dataframe(
+        deck_history.sort_values('updated_at', ascending=False)[['updated_at', 'market_price', 'source', 'condition', 'notes']],
+        hide_index=True,
+        column_config={
+            'updated_at': st.column_config.DatetimeColumn('Date'),
+            'market_price': st.column_config.NumberColumn('Market Price', format='$%.2f'),
+            'source': 'Source',
+            'condition': 'Condition',
+            'notes': 'Notes'
+        }
+    )
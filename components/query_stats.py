@@ -0,0 +1,86 @@
+import streamlit as st
+import plotly.express as px
+from datetime import datetime
+from database import db
+from instrumentation import query_stats
+
+def render_query_stats():
+    st.header("Query Stats")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        live = st.toggle("Live refresh (every 5s)", value=False)
+
+    with col2:
+        if st.button("Reset Stats"):
+            query_stats.reset()
+
+    query_stats.slow_query_ms = st.number_input(
+        "Slow query threshold (ms)",
+        min_value=1.0,
+        value=float(query_stats.slow_query_ms),
+        step=50.0,
+        help="Statements slower than this are logged together with their EXPLAIN plan"
+    )
+
+    st.fragment(run_every=5 if live else None)(_render_stats_panel)()
+
+    if db.replicas:
+        st.subheader("Read Replicas")
+        st.dataframe(db.replica_status(), hide_index=True)
+
+def _render_stats_panel():
+    summary = query_stats.method_summary()
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Method Calls", int(summary['calls'].sum()))
+
+    with col2:
+        st.metric("SQL Statements", query_stats.statement_count)
+
+    with col3:
+        st.metric("Slow Queries", len(query_stats.slow_queries))
+
+    st.caption(f"Collecting since {datetime.fromtimestamp(query_stats.started_at):%Y-%m-%d %H:%M:%S}")
+
+    if summary.empty:
+        st.info("No database calls recorded yet.")
+        return
+
+    st.subheader("Per-Method Latency")
+    st.dataframe(
+        summary,
+        hide_index=True,
+        column_config={
+            'total_ms': st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+            'mean_ms': st.column_config.NumberColumn("Mean (ms)", format="%.1f"),
+            'p50_ms': st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            'p95_ms': st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+            'p99_ms': st.column_config.NumberColumn("p99 (ms)", format="%.1f"),
+            'max_ms': st.column_config.NumberColumn("Max (ms)", format="%.1f"),
+            'bytes': st.column_config.NumberColumn("Bytes", format="%d")
+        }
+    )
+
+    method = st.selectbox("Latency histogram for", summary['method'])
+    fig = px.bar(
+        query_stats.histogram(method),
+        x='latency',
+        y='calls',
+        title=f"{method} latency distribution"
+    )
+    st.plotly_chart(fig)
+
+    st.subheader("Slow Query Log")
+    if not query_stats.slow_queries:
+        st.info(f"No statements slower than {query_stats.slow_query_ms:g} ms.")
+        return
+
+    for entry in reversed(list(query_stats.slow_queries)):
+        logged_at = datetime.fromtimestamp(entry['logged_at'])
+        with st.expander(f"{entry['elapsed_ms']:.1f} ms at {logged_at:%H:%M:%S}"):
+            st.code(entry['sql'], language="sql")
+            st.code(entry['plan'], language="text")
@@ -1,32 +1,68 @@
 import streamlit as st
 from database import db
+from utils import validate_image
 
 def render_search():
     st.header("Search Collection")
     
-    search_query = st.text_input("Search decks by name, manufacturer, or notes")
+    tab1, tab2 = st.tabs(["Search by Text", "Find by Photo"])
     
-    if search_query:
-        results = db.search_decks(search_query)
+    with tab1:
+        search_query = st.text_input("Search decks by name, manufacturer, or notes")
         
-        if not results:
-            st.info("No decks found matching your search.")
-            return
+        if search_query:
+            results = db.search_decks(search_query)
+            
+            if not results:
+                st.info("No decks found matching your search.")
+            
+            for deck in results:
+                render_deck_result(deck)
+    
+    with tab2:
+        render_photo_search()
+
+def render_photo_search():
+    from image_index import find_similar_decks, SIMILAR_DISTANCE
+    
+    photo = st.file_uploader("Upload a photo of a deck", type=['png', 'jpg', 'jpeg'], key="photo_search")
+    max_distance = st.slider("Match tolerance", 0, 20, SIMILAR_DISTANCE,
+                             help="Maximum number of differing hash bits; lower is stricter")
+    
+    if not photo:
+        return
+    
+    image_data, error = validate_image(photo)
+    if error:
+        st.error(f"Image error: {error}")
+        return
+    
+    matches = find_similar_decks(db, image_data, max_distance=max_distance)
+    if not matches:
+        st.info("No decks look like this photo.")
+        return
+    
+    distances = dict(matches)
+    for deck in db.get_decks_by_ids([deck_id for deck_id, _ in matches]):
+        render_deck_result(deck, label=f"{64 - distances[deck['id']]}/64 bits match")
+
+def render_deck_result(deck, label=None):
+    title = f"{deck['deck_name']} - {deck['manufacturer']}"
+    if label:
+        title += f" ({label})"
+    with st.expander(title):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.write(f"**Release Year:** {deck['release_year']}")
+            st.write(f"**Condition:** {deck['condition']}")
+            st.write(f"**Purchase Date:** {deck['purchase_date']}")
+            st.write(f"**Purchase Price:** ${deck['purchase_price']}")
+        
+        with col2:
+            if deck['image_data']:
+                st.image(bytes(deck['image_data']))
         
-        for deck in results:
-            with st.expander(f"{deck['deck_name']} - {deck['manufacturer']}"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write(f"**Release Year:** {deck['release_year']}")
-                    st.write(f"**Condition:** {deck['condition']}")
-                    st.write(f"**Purchase Date:** {deck['purchase_date']}")
-                    st.write(f"**Purchase Price:** ${deck['purchase_price']}")
-                
-                with col2:
-                    if deck['image_data']:
-                        st.image(deck['image_data'])
-                
-                if deck['notes']:
-                    st.write("**Notes:**")
-                    st.write(deck['notes'])
+        if deck['notes']:
+            st.write("**Notes:**")
+            st.write(deck['notes'])
@@ -3,6 +3,8 @@ from database import db
 import pandas as pd
 from datetime import datetime, timedelta
 
+SHARE_PAGE_SIZE = 50
+
 def render_share_collection():
     st.header("Share Collection")
     
@@ -88,7 +90,7 @@ def render_share_collection():
             return
         
         for _, share in shares_df.iterrows():
-            with st.expander(f"{share['name']} ({len(share['deck_ids'])} decks)"):
+            with st.expander(f"{share['name']} ({share['deck_count']} decks)"):
                 st.write(f"**Created:** {share['created_at']:%Y-%m-%d %H:%M}")
                 if share['expires_at'] is not None:
                     st.write(f"**Expires:** {share['expires_at']:%Y-%m-%d %H:%M}")
@@ -104,7 +106,8 @@ def render_share_collection():
 
 def render_shared_collection(share_id):
     try:
-        collection = db.get_shared_collection(share_id)
+        page = int(st.session_state.get("shared_collection_page", 1))
+        collection = db.get_shared_collection(share_id, limit=SHARE_PAGE_SIZE, offset=(page - 1) * SHARE_PAGE_SIZE)
         
         if not collection:
             st.error("This shared collection does not exist or has expired.")
@@ -119,12 +122,16 @@ def render_shared_collection(share_id):
         if collection['expires_at']:
             st.write(f"**Expires on:** {collection['expires_at']:%Y-%m-%d %H:%M}")
         
-        if not collection['decks']:
+        if not collection['deck_count']:
             st.info("This shared collection is empty.")
             return
         
-        # Display decks in a nice grid
-        st.subheader("Decks in this Collection")
+        # Display decks in a nice grid, one page at a time
+        st.subheader(f"Decks in this Collection ({collection['deck_count']})")
+        total_pages = -(-collection['deck_count'] // SHARE_PAGE_SIZE)
+        if total_pages > 1:
+            st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="shared_collection_page")
+            st.caption(f"Page {page} of {total_pages}")
         
         for deck in collection['decks']:
             with st.container():
@@ -2,9 +2,13 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from database import db
+from chart_data import top_n, binned_histogram, downsample_series
 import pandas as pd
 from datetime import datetime, timedelta
 
+# Valuation chart periods in days; None shows the full history
+VALUATION_PERIODS = {"1Y": 365, "5Y": 5 * 365, "All": None}
+
 def render_statistics():
     st.header("Collection Statistics")
     
@@ -30,7 +34,7 @@ def render_statistics():
     
     # Year-over-year collection growth
     st.subheader("Collection Growth")
-    df['year'] = pd.to_datetime(df['purchase_date']).dt.year
+    df['year'] = df['purchase_date'].dt.year
     yearly_growth = df.groupby('year').agg({
         'id': 'count',
         'purchase_price': 'sum'
@@ -56,20 +60,8 @@ def render_statistics():
     )
     st.plotly_chart(fig_growth)
     
-    # Value appreciation over time
-    st.subheader("Collection Value Growth")
-    yearly_growth['cumulative_value'] = yearly_growth['purchase_price'].cumsum()
-    fig_value = px.line(
-        yearly_growth,
-        x='year',
-        y='cumulative_value',
-        title='Total Collection Value Over Time'
-    )
-    fig_value.update_layout(
-        yaxis_title='Total Value ($)',
-        xaxis_title='Year'
-    )
-    st.plotly_chart(fig_value)
+    # Value appreciation over time, from the daily valuation snapshots
+    render_valuation_history(sorted(df['manufacturer'].astype(str).unique()), yearly_growth)
     
     # Manufacturer Distribution
     st.subheader("Collection Distribution")
@@ -77,9 +69,9 @@ def render_statistics():
     
     with col1:
         fig_manufacturer = px.pie(
-            df,
+            top_n(df, 'manufacturer', 'purchase_price'),
             names='manufacturer',
-            values='purchase_price',
+            values='value',
             title='Value by Manufacturer'
         )
         st.plotly_chart(fig_manufacturer)
@@ -93,6 +85,17 @@ def render_statistics():
         )
         st.plotly_chart(fig_condition)
     
+    # Purchase price distribution
+    price_bins = binned_histogram(df['purchase_price'])
+    fig_prices = px.bar(
+        price_bins,
+        x='label',
+        y='count',
+        title='Purchase Price Distribution',
+        labels={'label': 'Purchase Price ($)', 'count': 'Decks'}
+    )
+    st.plotly_chart(fig_prices)
+    
     # Collection Completion Metrics
     st.subheader("Collection Completion Metrics")
     total_manufacturers = len(df['manufacturer'].unique())
@@ -110,3 +113,69 @@ def render_statistics():
     with col3:
         condition_completion = (total_conditions / 6) * 100  # 6 possible conditions
         st.metric("Condition Coverage", f"{condition_completion:.1f}%")
+
+@st.fragment
+def render_valuation_history(manufacturers, yearly_growth):
+    """Snapshot value chart; changing its scope or period reruns only this fragment"""
+    st.subheader("Collection Value Growth")
+    col1, col2 = st.columns(2)
+    with col1:
+        scope = st.selectbox(
+            "Valuation of",
+            options=[None] + manufacturers,
+            format_func=lambda name: "Whole collection" if name is None else name,
+            key="valuation_scope"
+        )
+    with col2:
+        period = st.radio("Period", list(VALUATION_PERIODS), index=len(VALUATION_PERIODS) - 1,
+                          horizontal=True, key="valuation_period")
+    days = VALUATION_PERIODS[period]
+    start_date = datetime.now().date() - timedelta(days=days) if days else None
+    
+    try:
+        history = db.get_valuation_history(manufacturer=scope, start_date=start_date)
+    except Exception as e:
+        st.error(f"Error loading valuation history: {str(e)}")
+        history = pd.DataFrame()
+    
+    if not history.empty:
+        series = downsample_series(history, 'snapshot_date', 'market_value')
+        fig_value = go.Figure()
+        fig_value.add_trace(go.Scattergl(
+            x=series['snapshot_date'],
+            y=series['market_value'],
+            mode='lines',
+            name='Market Value'
+        ))
+        fig_value.add_trace(go.Scattergl(
+            x=series['snapshot_date'],
+            y=series['cost_basis'],
+            mode='lines',
+            name='Cost Basis'
+        ))
+        fig_value.update_layout(
+            title='Collection Value Over Time',
+            yaxis_title='Value ($)',
+            xaxis_title='Date'
+        )
+        st.plotly_chart(fig_value)
+        latest = history.iloc[-1]
+        if latest['valued_decks'] < latest['deck_count']:
+            st.caption(f"{latest['deck_count'] - latest['valued_decks']} of {latest['deck_count']} decks "
+                       "have no market value yet and are valued at their purchase price")
+    else:
+        # No snapshots yet: fall back to cumulative purchase prices by year
+        yearly_growth['cumulative_value'] = yearly_growth['purchase_price'].cumsum()
+        fig_value = px.line(
+            yearly_growth,
+            x='year',
+            y='cumulative_value',
+            title='Total Collection Value Over Time'
+        )
+        fig_value.update_layout(
+            yaxis_title='Total Value ($)',
+            xaxis_title='Year'
+        )
+        st.plotly_chart(fig_value)
+        st.caption("Showing purchase prices only. Market valuations are charted once the daily "
+                   "valuation snapshot has run (python maintenance.py --task valuation_snapshot).")
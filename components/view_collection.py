@@ -6,6 +6,10 @@ from utils import prepare_export_data
 def render_view_collection():
     st.header("Card Collection")
     
+    # Set by bulk actions just before they rerun the page
+    if "collection_message" in st.session_state:
+        st.success(st.session_state.pop("collection_message"))
+    
     # Get all decks
     df = db.get_all_decks()
     
@@ -13,6 +17,15 @@ def render_view_collection():
         st.info("No decks in your collection yet. Add some decks to get started!")
         return
     
+    render_collection_table(df)
+
+@st.fragment
+def render_collection_table(df):
+    """Filters, table, bulk actions and export over the loaded decks.
+
+    Filtering and row selection rerun only this fragment against the frame
+    from the last full run; bulk edits rerun the page to reload it.
+    """
     # Add filter controls
     col1, col2 = st.columns(2)
     with col1:
@@ -34,10 +47,14 @@ def render_view_collection():
         df = df[df['condition'].isin(condition_filter)]
     
     # Display table
-    display_df = df.drop(columns=['image_data'])
-    st.dataframe(
+    display_df = df.drop(columns=['image_data', 'image_phash'], errors='ignore')
+    table = st.dataframe(
         display_df,
+        key="collection_table",
+        on_select="rerun",
+        selection_mode="multi-row",
         column_config={
+            "purchase_date": st.column_config.DateColumn("Purchase Date"),
             "purchase_price": st.column_config.NumberColumn(
                 "Purchase Price",
                 format="$%.2f"
@@ -49,6 +66,8 @@ def render_view_collection():
         }
     )
     
+    render_bulk_actions(display_df, table.selection.rows, manufacturer_filter, condition_filter)
+    
     # Export functionality
     if st.button("Export to CSV"):
         export_df = prepare_export_data(df)
@@ -59,3 +78,59 @@ def render_view_collection():
             file_name="card_collection.csv",
             mime="text/csv"
         )
+
+def render_bulk_actions(display_df, selected_rows, manufacturer_filter, condition_filter):
+    filters = {}
+    if manufacturer_filter:
+        filters['manufacturer'] = manufacturer_filter
+    if condition_filter:
+        filters['condition'] = condition_filter
+    
+    with st.expander("Bulk Actions", expanded=bool(selected_rows)):
+        target = st.radio(
+            "Apply to",
+            ["Selected rows", "All decks matching the filters"],
+            horizontal=True,
+            help="Select rows by clicking the checkboxes at the left of the table"
+        )
+        
+        if target == "Selected rows":
+            selection = {'deck_ids': display_df.iloc[selected_rows]['id'].tolist()}
+            target_count = len(selected_rows)
+        else:
+            selection = {'filters': filters}
+            target_count = len(display_df) if filters else 0
+        
+        if target_count == 0:
+            st.info("Select some rows or set a filter to use bulk actions.")
+            return
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            new_condition = st.selectbox("Set Condition",
+                                         ["Mint", "Near Mint", "Excellent", "Good", "Fair", "Poor"])
+            if st.button(f"Update {target_count} Decks"):
+                try:
+                    updated = db.update_decks({'condition': new_condition}, **selection)
+                    del st.session_state["collection_table"]
+                    st.session_state["collection_message"] = f"Updated {updated} decks!"
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error updating decks: {str(e)}")
+        
+        with col2:
+            if 'deck_ids' in selection:
+                shares_df = db.get_shares_for_decks(selection['deck_ids'])
+                if not shares_df.empty:
+                    st.warning("Deleting removes these decks from shares: " +
+                               ", ".join(f"{row.name} ({row.matching_decks})" for row in shares_df.itertuples()))
+            confirm = st.checkbox(f"Yes, permanently delete {target_count} decks and their market values")
+            if st.button(f"Delete {target_count} Decks", type="primary", disabled=not confirm):
+                try:
+                    deleted = db.delete_decks(**selection)
+                    del st.session_state["collection_table"]
+                    st.session_state["collection_message"] = f"Deleted {deleted} decks!"
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error deleting decks: {str(e)}")
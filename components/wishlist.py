@@ -1,12 +1,27 @@
 import streamlit as st
 from database import db
+from components.fragments import rerun_fragment
+
+WISHLIST_PAGE_SIZE = 50
 
 def render_wishlist():
     st.header("Wishlist")
     
-    # Add new wishlist item form
+    # Alerts and the list are separate fragments: adding, editing, removing,
+    # filtering or paging reruns only the list, and dismissing an alert only
+    # the alerts. A list change reruns the whole page only when it also
+    # changes which alerts are shown.
+    render_price_alerts()
+    render_wishlist_items()
+
+def render_add_wishlist_form():
+    """Add form shown at the top of the list fragment"""
+    # A new form key after a successful add starts the form empty; failed
+    # submits keep the input for correction
+    version = st.session_state.setdefault("add_wishlist_form_version", 0)
+    
     with st.expander("Add New Wishlist Item", expanded=False):
-        with st.form("add_wishlist_form"):
+        with st.form(f"add_wishlist_form_{version}"):
             deck_name = st.text_input("Deck Name*")
             manufacturer = st.text_input("Manufacturer*")
             expected_price = st.number_input("Expected Price ($)", min_value=0.0, step=0.01)
@@ -16,58 +31,159 @@ def render_wishlist():
             
             submit = st.form_submit_button("Add to Wishlist")
             
-            if submit:
-                if not deck_name or not manufacturer:
-                    st.error("Deck name and manufacturer are required!")
-                    return
-                
-                wishlist_data = {
-                    'deck_name': deck_name,
-                    'manufacturer': manufacturer,
-                    'expected_price': expected_price,
-                    'priority': priority,
-                    'notes': notes
-                }
-                
-                try:
-                    db.add_to_wishlist(wishlist_data)
-                    st.success("Item added to wishlist!")
-                    st.session_state.clear()
-                except Exception as e:
-                    st.error(f"Error adding to wishlist: {str(e)}")
+            if not submit:
+                return
+            
+            if not deck_name or not manufacturer:
+                st.error("Deck name and manufacturer are required!")
+                return
+            
+            wishlist_data = {
+                'deck_name': deck_name,
+                'manufacturer': manufacturer,
+                'expected_price': expected_price,
+                'priority': priority,
+                'notes': notes
+            }
+            
+            try:
+                wishlist_id = db.add_to_wishlist(wishlist_data)
+                new_alerts = db.match_price_alerts(wishlist_ids=[wishlist_id])
+            except Exception as e:
+                st.error(f"Error adding to wishlist: {str(e)}")
+                return
+    
+    st.session_state["add_wishlist_form_version"] = version + 1
+    st.session_state["wishlist_items_message"] = "Item added to wishlist!"
+    _rerun_after_change(new_alerts > 0)
+
+@st.fragment
+def render_wishlist_items():
+    if "wishlist_items_message" in st.session_state:
+        st.success(st.session_state.pop("wishlist_items_message"))
     
-    # Display wishlist
-    df = db.get_wishlist()
+    render_add_wishlist_form()
+    
+    # Display wishlist one page at a time, grouped by priority
+    col1, col2 = st.columns(2)
+    with col1:
+        priority_filter = st.selectbox("Show Priority", ["All", 5, 4, 3, 2, 1])
+    with col2:
+        page = st.number_input("Page", min_value=1, value=1, step=1)
+    
+    priority = None if priority_filter == "All" else priority_filter
+    df = db.get_wishlist_page(limit=WISHLIST_PAGE_SIZE, offset=(page - 1) * WISHLIST_PAGE_SIZE, priority=priority)
     
     if df.empty:
-        st.info("Your wishlist is empty. Add some decks you'd like to acquire!")
+        if page > 1:
+            st.info("No items on this page.")
+        else:
+            st.info("Your wishlist is empty. Add some decks you'd like to acquire!")
         return
     
-    # Display wishlist items grouped by priority
-    for priority in range(5, 0, -1):
-        priority_items = df[df['priority'] == priority]
-        if not priority_items.empty:
-            st.subheader(f"Priority {priority} Items")
-            
-            for _, item in priority_items.iterrows():
-                with st.container():
-                    col1, col2, col3 = st.columns([3, 1, 1])
-                    
-                    with col1:
-                        st.write(f"**{item['deck_name']}** by {item['manufacturer']}")
-                        if item['notes']:
-                            st.write(f"*Notes:* {item['notes']}")
-                    
-                    with col2:
-                        st.write(f"Expected: ${item['expected_price']:.2f}")
-                    
-                    with col3:
-                        if st.button("Remove", key=f"remove_{item['id']}"):
-                            try:
-                                db.remove_from_wishlist(item['id'])
-                                st.success("Item removed from wishlist!")
-                                st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f"Error removing item: {str(e)}")
-                    
-                    st.markdown("---")
+    total_count = int(df['total_count'].iloc[0])
+    total_pages = -(-total_count // WISHLIST_PAGE_SIZE)
+    st.caption(f"Page {page} of {total_pages} · {total_count} items")
+    
+    editable_columns = ['id', 'deck_name', 'manufacturer', 'expected_price', 'priority', 'notes']
+    with st.form("wishlist_edit_form"):
+        edited_groups = []
+        for group_priority, items in df.groupby('priority', sort=False):
+            st.subheader(f"Priority {group_priority} Items ({int(items['priority_count'].iloc[0])})")
+            original = items[editable_columns].assign(notes=items['notes'].fillna(''), remove=False)
+            editor_key = f"wishlist_editor_{priority_filter}_{page}_{group_priority}"
+            edited = st.data_editor(
+                original,
+                key=editor_key,
+                hide_index=True,
+                disabled=['id', 'deck_name', 'manufacturer'],
+                column_config={
+                    'id': None,
+                    'deck_name': "Deck",
+                    'manufacturer': "Manufacturer",
+                    'expected_price': st.column_config.NumberColumn("Expected Price", min_value=0.0, format="$%.2f"),
+                    'priority': st.column_config.NumberColumn("Priority", min_value=1, max_value=5, step=1),
+                    'notes': "Notes",
+                    'remove': st.column_config.CheckboxColumn("Remove")
+                }
+            )
+            edited_groups.append((editor_key, original, edited))
+        
+        submit = st.form_submit_button("Save Changes")
+    
+    if submit:
+        removed_ids = []
+        updates = []
+        for _, original, edited in edited_groups:
+            removed_ids += edited.loc[edited['remove'], 'id'].tolist()
+            kept = edited[~edited['remove']].set_index('id')
+            before = original.set_index('id').loc[kept.index]
+            fields = ['expected_price', 'priority', 'notes']
+            changed = (kept[fields] != before[fields]).any(axis=1)
+            updates += kept.loc[changed, fields].reset_index().to_dict('records')
+        
+        try:
+            if removed_ids:
+                db.remove_from_wishlist(removed_ids)
+            new_alerts = 0
+            if updates:
+                db.update_wishlist_items(updates)
+                new_alerts = db.match_price_alerts(wishlist_ids=[update['id'] for update in updates])
+            if removed_ids or updates:
+                # Editor edits are positional; drop them so they don't apply to shifted rows
+                for editor_key, _, _ in edited_groups:
+                    del st.session_state[editor_key]
+                st.session_state["wishlist_items_message"] = f"Removed {len(removed_ids)} and updated {len(updates)} wishlist items!"
+            else:
+                st.info("No changes to save.")
+                return
+        except Exception as e:
+            st.error(f"Error saving wishlist changes: {str(e)}")
+            return
+        
+        # Removed items take their alerts with them and edited prices may raise new ones
+        alerted_ids = st.session_state.get("alerted_wishlist_ids", set())
+        _rerun_after_change(new_alerts > 0 or any(int(i) in alerted_ids for i in removed_ids))
+
+def _rerun_after_change(alerts_changed):
+    """Rerun the whole page when the shown alerts changed, otherwise just the list"""
+    if alerts_changed:
+        st.rerun()
+    rerun_fragment()
+
+@st.fragment
+def render_price_alerts():
+    try:
+        # Read-only: alerts are matched when market values are recorded and by the maintenance task
+        alerts_df = db.get_price_alerts()
+    except Exception as e:
+        st.error(f"Error loading price alerts: {str(e)}")
+        return
+    
+    # Lets the list tell whether a removal also removes a visible alert
+    st.session_state["alerted_wishlist_ids"] = set(alerts_df['wishlist_id'].astype(int))
+    
+    if alerts_df.empty:
+        return
+    
+    st.subheader(f"🔔 Price Alerts ({len(alerts_df)})")
+    for _, alert in alerts_df.iterrows():
+        col1, col2, col3 = st.columns([3, 2, 1])
+        
+        with col1:
+            st.write(f"**{alert['deck_name']}** by {alert['manufacturer']}")
+            st.caption(f"{alert['source']} · {alert['condition']} · {alert['updated_at']:%Y-%m-%d}")
+        
+        with col2:
+            st.write(f"${alert['market_price']:.2f} (expected ${alert['expected_price']:.2f})")
+        
+        with col3:
+            if st.button("Dismiss", key=f"dismiss_alert_{alert['id']}"):
+                try:
+                    db.dismiss_price_alerts([alert['id']])
+                except Exception as e:
+                    st.error(f"Error dismissing alert: {str(e)}")
+                else:
+                    rerun_fragment()
+    
+    st.markdown("---")
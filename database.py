@@ -1,40 +1,139 @@
 import os
+import io
+import contextvars
+import inspect
+import logging
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import time
+import random
 from datetime import datetime
 import uuid
+from image_index import add_to_image_index
+from instrumentation import InstrumentedConnection, instrumented
+from errors import DatabaseUnavailableError
+from utils import (compute_image_hash, compact_frame, DECK_FRAME_SCHEMA, WISHLIST_FRAME_SCHEMA,
+                   MARKET_VALUE_FRAME_SCHEMA, VALUATION_FRAME_SCHEMA)
+
+logger = logging.getLogger(__name__)
+
+# Seconds a replica is behind; 0 when it has replayed everything it received
+# (or is not a standby at all, e.g. a plain second instance used for testing)
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+DECK_FILTER_COLUMNS = ['deck_name', 'manufacturer', 'release_year', 'condition']
+DECK_EDITABLE_COLUMNS = ['deck_name', 'manufacturer', 'release_year', 'condition',
+                         'purchase_date', 'purchase_price', 'notes']
+
+ACTIVE_SHARES_SQL = """
+    SELECT sc.*,
+           (SELECT COUNT(*) FROM shared_collection_decks scd WHERE scd.collection_id = sc.id) AS deck_count
+    FROM shared_collections sc
+    WHERE sc.expires_at IS NULL OR sc.expires_at > CURRENT_TIMESTAMP
+    ORDER BY sc.created_at DESC
+"""
+
+# Statement timeouts per query class. Page reads and writes must stay
+# interactive; bulk jobs (imports, bulk edits, backups, streams, maintenance)
+# get a much longer budget. 0 disables a timeout.
+INTERACTIVE_TIMEOUT_MS = int(os.environ.get('PG_INTERACTIVE_TIMEOUT_MS', 15000))
+BULK_TIMEOUT_MS = int(os.environ.get('PG_BULK_TIMEOUT_MS', 600000))
+LOCK_TIMEOUT_MS = int(os.environ.get('PG_LOCK_TIMEOUT_MS', 5000))
+
+# Rows fetched per round trip by the iter_* streaming methods
+STREAM_ITERSIZE = int(os.environ.get('PG_STREAM_ITERSIZE', 10000))
+
+# Re-scan this much history before the watermark so price rows committed late
+# (their updated_at is their transaction's start time) are not missed
+ALERT_WATERMARK_OVERLAP = '5 minutes'
 
 class Database:
     def __init__(self):
-        self.max_retries = 3
-        self.retry_delay = 1  # seconds
+        self.max_retries = int(os.environ.get('PG_CONNECT_RETRIES', 5))
+        self.retry_base_delay = float(os.environ.get('PG_RETRY_BASE_SECONDS', 0.2))
+        self.retry_max_delay = float(os.environ.get('PG_RETRY_MAX_SECONDS', 5))
+        self.circuit_open_seconds = float(os.environ.get('PG_CIRCUIT_OPEN_SECONDS', 30))
+        self.circuit_open_until = 0.0
+        self.connect_lock = threading.Lock()
         self.conn = None
+        self.image_hash_version = 0  # bumped on bulk hash changes and deletes in this process
+        self.read_pool = None
+        self.read_executor = None
+        self.read_pool_size = int(os.environ.get('PG_READ_POOL_SIZE', 4))
+        self.pool_lock = threading.Lock()
+        self.local = threading.local()
         self.connect()
         self.init_migrations()
+        self.init_replicas()
         
     def connect(self):
-        retry_count = 0
-        last_error = None
-        
-        while retry_count < self.max_retries:
-            try:
-                self.conn = psycopg2.connect(
-                    dbname=os.environ['PGDATABASE'],
-                    user=os.environ['PGUSER'],
-                    password=os.environ['PGPASSWORD'],
-                    host=os.environ['PGHOST'],
-                    port=os.environ['PGPORT']
-                )
-                return
-            except Exception as e:
-                last_error = str(e)
-                retry_count += 1
-                if retry_count < self.max_retries:
-                    time.sleep(self.retry_delay)
-                    
-        raise Exception(f"Failed to connect to database after {self.max_retries} attempts. Last error: {last_error}")
+        """(Re)connect the main connection with exponential backoff and jitter.
+
+        When every attempt fails the circuit breaker opens: further calls
+        fail fast with DatabaseUnavailableError until PG_CIRCUIT_OPEN_SECONDS
+        have passed, then a single probe attempt decides whether it closes.
+        """
+        with self.connect_lock:
+            if self.conn is not None and not self.conn.closed and time.monotonic() >= self.circuit_open_until:
+                try:
+                    with self.conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    return  # another session already reconnected
+                except psycopg2.Error:
+                    self.conn.close()
+            remaining = self.circuit_open_until - time.monotonic()
+            if remaining > 0:
+                raise DatabaseUnavailableError(f"Database unavailable; retrying in {remaining:.0f}s")
+
+            # A half-open circuit gets one probe, not a full retry cycle
+            attempts = 1 if self.circuit_open_until else self.max_retries
+            last_error = None
+            for attempt in range(attempts):
+                try:
+                    self.conn = self.new_connection(timeout_ms=INTERACTIVE_TIMEOUT_MS)
+                    self.circuit_open_until = 0.0
+                    return
+                except Exception as e:
+                    last_error = str(e)
+                    if attempt + 1 < attempts:
+                        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+                        time.sleep(random.uniform(delay / 2, delay))
+
+            self.circuit_open_until = time.monotonic() + self.circuit_open_seconds
+            logger.error("Database unreachable, failing fast for %.0fs: %s", self.circuit_open_seconds, last_error)
+            raise DatabaseUnavailableError(
+                f"Failed to connect to database after {attempts} attempts. Last error: {last_error}")
+
+    def connection_params(self, timeout_ms=BULK_TIMEOUT_MS):
+        return dict(
+            dbname=os.environ['PGDATABASE'],
+            user=os.environ['PGUSER'],
+            password=os.environ['PGPASSWORD'],
+            host=os.environ['PGHOST'],
+            port=os.environ['PGPORT'],
+            connect_timeout=int(os.environ.get('PG_CONNECT_TIMEOUT', 5)),
+            options=_timeout_options(timeout_ms),
+            connection_factory=InstrumentedConnection
+        )
+
+    def new_connection(self, timeout_ms=BULK_TIMEOUT_MS):
+        """Open an additional connection to the primary database.
+
+        Extra connections serve backups, streams and other bulk jobs, so they
+        default to the bulk statement timeout.
+        """
+        return psycopg2.connect(**self.connection_params(timeout_ms))
 
     def init_migrations(self):
         """Initialize migrations table and system"""
@@ -138,6 +237,193 @@ class Database:
                     'down': """
                         DROP TABLE IF EXISTS shared_collections;
                     """
+                },
+                {
+                    'version': 6,
+                    'name': 'add_price_alerts',
+                    'up': """
+                        CREATE OR REPLACE FUNCTION normalize_name(value TEXT) RETURNS TEXT AS $$
+                            SELECT btrim(regexp_replace(
+                                regexp_replace(lower(value), '[''’]', '', 'g'),
+                                '[^a-z0-9]+', ' ', 'g'
+                            ))
+                        $$ LANGUAGE SQL IMMUTABLE;
+
+                        CREATE INDEX IF NOT EXISTS wishlist_normalized_name_idx
+                            ON wishlist (normalize_name(deck_name), normalize_name(manufacturer));
+                        CREATE INDEX IF NOT EXISTS decks_normalized_name_idx
+                            ON decks (normalize_name(deck_name), normalize_name(manufacturer));
+                        CREATE INDEX IF NOT EXISTS market_values_updated_at_idx
+                            ON market_values (updated_at);
+
+                        CREATE TABLE IF NOT EXISTS price_alerts (
+                            id SERIAL PRIMARY KEY,
+                            wishlist_id INTEGER NOT NULL REFERENCES wishlist(id) ON DELETE CASCADE,
+                            market_value_id INTEGER NOT NULL REFERENCES market_values(id) ON DELETE CASCADE,
+                            market_price DECIMAL(10,2) NOT NULL,
+                            expected_price DECIMAL(10,2) NOT NULL,
+                            dismissed BOOLEAN DEFAULT false,
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            UNIQUE(wishlist_id, market_value_id)
+                        );
+
+                        CREATE TABLE IF NOT EXISTS job_watermarks (
+                            job VARCHAR(100) PRIMARY KEY,
+                            watermark TIMESTAMP NOT NULL
+                        );
+                    """,
+                    'down': """
+                        DROP TABLE IF EXISTS job_watermarks;
+                        DROP TABLE IF EXISTS price_alerts;
+                        DROP INDEX IF EXISTS market_values_updated_at_idx;
+                        DROP INDEX IF EXISTS decks_normalized_name_idx;
+                        DROP INDEX IF EXISTS wishlist_normalized_name_idx;
+                        DROP FUNCTION IF EXISTS normalize_name(TEXT);
+                    """
+                },
+                {
+                    'version': 7,
+                    'name': 'add_wishlist_page_index',
+                    'up': """
+                        CREATE INDEX IF NOT EXISTS wishlist_priority_created_idx
+                            ON wishlist (priority DESC, created_at DESC);
+                    """,
+                    'down': """
+                        DROP INDEX IF EXISTS wishlist_priority_created_idx;
+                    """
+                },
+                {
+                    'version': 8,
+                    'name': 'add_image_phash',
+                    'up': """
+                        ALTER TABLE decks ADD COLUMN IF NOT EXISTS image_phash BIGINT;
+                        CREATE INDEX IF NOT EXISTS decks_missing_phash_idx ON decks (id)
+                            WHERE image_phash IS NULL AND image_data IS NOT NULL;
+                    """,
+                    'down': """
+                        DROP INDEX IF EXISTS decks_missing_phash_idx;
+                        ALTER TABLE decks DROP COLUMN IF EXISTS image_phash;
+                    """
+                },
+                {
+                    'version': 9,
+                    'name': 'add_shared_collection_decks',
+                    'up': """
+                        CREATE TABLE IF NOT EXISTS shared_collection_decks (
+                            collection_id INTEGER NOT NULL REFERENCES shared_collections(id) ON DELETE CASCADE,
+                            deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+                            position INTEGER NOT NULL,
+                            PRIMARY KEY (collection_id, position)
+                        );
+                        CREATE INDEX IF NOT EXISTS shared_collection_decks_deck_idx
+                            ON shared_collection_decks (deck_id, collection_id);
+
+                        -- Ids of decks deleted before this migration are dropped
+                        INSERT INTO shared_collection_decks (collection_id, deck_id, position)
+                        SELECT sc.id, t.deck_id, t.position
+                        FROM shared_collections sc,
+                             unnest(sc.deck_ids) WITH ORDINALITY AS t(deck_id, position)
+                        WHERE EXISTS (SELECT 1 FROM decks d WHERE d.id = t.deck_id);
+
+                        ALTER TABLE shared_collections DROP COLUMN deck_ids;
+                    """,
+                    'down': """
+                        ALTER TABLE shared_collections ADD COLUMN deck_ids INTEGER[] NOT NULL DEFAULT '{}';
+                        UPDATE shared_collections sc SET deck_ids = ARRAY(
+                            SELECT deck_id FROM shared_collection_decks
+                            WHERE collection_id = sc.id
+                            ORDER BY position
+                        );
+                        ALTER TABLE shared_collections ALTER COLUMN deck_ids DROP DEFAULT;
+                        DROP TABLE IF EXISTS shared_collection_decks;
+                    """
+                },
+                {
+                    'version': 10,
+                    'name': 'add_maintenance_indexes',
+                    'up': """
+                        CREATE INDEX IF NOT EXISTS shared_collections_expires_at_idx
+                            ON shared_collections (expires_at) WHERE expires_at IS NOT NULL;
+                        CREATE INDEX IF NOT EXISTS price_alerts_dismissed_created_idx
+                            ON price_alerts (created_at) WHERE dismissed;
+                    """,
+                    'down': """
+                        DROP INDEX IF EXISTS price_alerts_dismissed_created_idx;
+                        DROP INDEX IF EXISTS shared_collections_expires_at_idx;
+                    """
+                },
+                {
+                    'version': 11,
+                    'name': 'add_valuation_snapshots',
+                    'up': """
+                        CREATE TABLE IF NOT EXISTS valuation_snapshots (
+                            scope VARCHAR(20) NOT NULL CHECK (scope IN ('collection', 'manufacturer')),
+                            scope_key VARCHAR(255) NOT NULL DEFAULT '',
+                            snapshot_date DATE NOT NULL,
+                            deck_count INTEGER NOT NULL,
+                            valued_decks INTEGER NOT NULL,
+                            cost_basis DECIMAL(12,2) NOT NULL,
+                            market_value DECIMAL(12,2) NOT NULL,
+                            PRIMARY KEY (scope, scope_key, snapshot_date)
+                        );
+                    """,
+                    'down': "DROP TABLE IF EXISTS valuation_snapshots"
+                },
+                {
+                    'version': 12,
+                    'name': 'match_dedupe_name_normalization',
+                    # Same steps as dedupe.normalize_name: strip accents, drop
+                    # apostrophes and punctuation, then drop FILLER_WORDS unless
+                    # nothing else is left
+                    'up': """
+                        CREATE OR REPLACE FUNCTION normalize_name(value TEXT) RETURNS TEXT AS $$
+                            SELECT COALESCE(
+                                (SELECT string_agg(token, ' ' ORDER BY position)
+                                 FROM unnest(string_to_array(cleaned, ' ')) WITH ORDINALITY AS t(token, position)
+                                 WHERE token <> ALL (ARRAY['the', 'of', 'and', 'deck', 'decks',
+                                                           'playing', 'card', 'cards'])),
+                                cleaned
+                            )
+                            FROM (
+                                SELECT btrim(regexp_replace(
+                                    regexp_replace(
+                                        lower(regexp_replace(normalize(value, NFKD), '[\u0300-\u036f]', '', 'g')),
+                                        '[''’]', '', 'g'
+                                    ),
+                                    '[^a-z0-9]+', ' ', 'g'
+                                )) AS cleaned
+                            ) normalized
+                        $$ LANGUAGE SQL IMMUTABLE;
+                        REINDEX INDEX wishlist_normalized_name_idx;
+                        REINDEX INDEX decks_normalized_name_idx;
+                    """,
+                    'down': """
+                        CREATE OR REPLACE FUNCTION normalize_name(value TEXT) RETURNS TEXT AS $$
+                            SELECT btrim(regexp_replace(
+                                regexp_replace(lower(value), '[''’]', '', 'g'),
+                                '[^a-z0-9]+', ' ', 'g'
+                            ))
+                        $$ LANGUAGE SQL IMMUTABLE;
+                        REINDEX INDEX wishlist_normalized_name_idx;
+                        REINDEX INDEX decks_normalized_name_idx;
+                    """
+                },
+                {
+                    'version': 13,
+                    'name': 'add_image_hash_failed',
+                    # Images the backfill could not decode are marked so it stops retrying them
+                    'up': """
+                        ALTER TABLE decks ADD COLUMN IF NOT EXISTS image_hash_failed BOOLEAN NOT NULL DEFAULT false;
+                        DROP INDEX IF EXISTS decks_missing_phash_idx;
+                        CREATE INDEX decks_missing_phash_idx ON decks (id)
+                            WHERE image_phash IS NULL AND image_data IS NOT NULL AND NOT image_hash_failed;
+                    """,
+                    'down': """
+                        DROP INDEX IF EXISTS decks_missing_phash_idx;
+                        CREATE INDEX decks_missing_phash_idx ON decks (id)
+                            WHERE image_phash IS NULL AND image_data IS NOT NULL;
+                        ALTER TABLE decks DROP COLUMN IF EXISTS image_hash_failed;
+                    """
                 }
             ]
             
@@ -151,7 +437,8 @@ class Database:
                             (migration['version'], migration['name'], 'pending', migration['down'])
                         )
                         
-                        # Apply migration
+                        # Apply migration; data migrations may run long
+                        self._use_bulk_timeout(cur)
                         cur.execute(migration['up'])
                         
                         # Mark as completed
@@ -194,7 +481,169 @@ class Database:
                 self.conn.rollback()
                 raise Exception(f"Rollback failed for version {version}: {str(e)}")
 
+    def init_replicas(self):
+        """Configure optional read replicas from PG_REPLICA_DSNS (comma-separated DSNs)"""
+        dsns = [dsn.strip() for dsn in os.environ.get('PG_REPLICA_DSNS', '').split(',') if dsn.strip()]
+        self.replicas = [{'dsn': dsn, 'conn': None, 'pool': None, 'healthy': False, 'checked_at': 0.0, 'lag': None}
+                         for dsn in dsns]
+        self.replica_index = 0
+        self.replica_max_lag = float(os.environ.get('PG_REPLICA_MAX_LAG_SECONDS', 5))
+        self.replica_check_interval = float(os.environ.get('PG_REPLICA_CHECK_SECONDS', 10))
+        self.read_your_writes_window = float(os.environ.get('PG_READ_YOUR_WRITES_SECONDS', 5))
+        self.last_write_at = 0.0
+        self.replica_lock = threading.Lock()
+
+    def commit(self):
+        """Commit on the primary and keep reads there for the read-your-writes window"""
+        self.conn.commit()
+        self.last_write_at = time.monotonic()
+
+    def read(self, query):
+        """Run query(conn) on a healthy replica, falling back to the primary.
+
+        Reads stay on the primary right after a write so users see their own
+        changes; a replica that fails mid-query is marked unhealthy and the
+        query is retried on the primary.
+        """
+        replica = self._pick_replica()
+        if replica is not None:
+            try:
+                if getattr(self.local, 'conn', None) is not None:
+                    return self._read_replica_pooled(replica, query)
+                return query(replica['conn'])
+            except Exception as e:
+                if not (replica['conn'].closed or _is_connection_error(e)):
+                    raise
+                logger.warning("Replica %s failed, falling back to primary: %s", _dsn_host(replica['dsn']), e)
+                replica['healthy'] = False
+                replica['checked_at'] = time.monotonic()
+        pooled = getattr(self.local, 'conn', None)
+        if pooled is not None:
+            return query(pooled)
+        self.ensure_connection()
+        try:
+            return query(self.conn)
+        except Exception as e:
+            if not (self.conn.closed or _is_connection_error(e)):
+                # e.g. a statement timeout; don't leave the session in an aborted transaction
+                self.conn.rollback()
+                raise
+            logger.warning("Primary connection lost during a read, reconnecting: %s", e)
+        # Reads are idempotent, so retry once on a fresh connection
+        self.connect()
+        return query(self.conn)
+
+    def run_parallel(self, *calls):
+        """Run independent reads concurrently and return their results in order.
+
+        Each call is a zero-argument callable such as ``db.get_all_decks`` or
+        ``lambda: db.get_market_values(deck_id)``. Calls that read from the
+        primary each borrow their own connection from a pool of
+        PG_READ_POOL_SIZE, and calls routed to a replica borrow from a pool of
+        the same size for that replica, so page latency is that of the
+        slowest query.
+        Only pass read methods; writes always use the main connection.
+        """
+        if len(calls) < 2:
+            return [call() for call in calls]
+        with self.pool_lock:
+            if self.read_pool is None:
+                self.read_pool = ThreadedConnectionPool(1, self.read_pool_size,
+                                                        **self.connection_params(INTERACTIVE_TIMEOUT_MS))
+                self.read_executor = ThreadPoolExecutor(max_workers=self.read_pool_size,
+                                                        thread_name_prefix='db-read')
+        # Workers run in a copy of the caller's context so per-render statement timers see their queries
+        futures = [self.read_executor.submit(contextvars.copy_context().run, self._run_pooled, call) for call in calls]
+        return [future.result() for future in futures]
+
+    def _run_pooled(self, call):
+        conn = self.read_pool.getconn()
+        broken = False
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("pooled connection closed")
+            if not conn.autocommit:
+                conn.set_session(readonly=True, autocommit=True)
+            self.local.conn = conn
+            return call()
+        except Exception as e:
+            broken = conn.closed or _is_connection_error(e)
+            raise
+        finally:
+            self.local.conn = None
+            self.read_pool.putconn(conn, close=broken)
+
+    def _read_replica_pooled(self, replica, query):
+        """Run query on a connection of the replica's own pool.
+
+        run_parallel workers read concurrently, so they must not share the
+        replica's single health-checked connection.
+        """
+        with self.pool_lock:
+            if replica['pool'] is None:
+                replica['pool'] = ThreadedConnectionPool(0, self.read_pool_size, replica['dsn'], connect_timeout=2,
+                                                         options=_timeout_options(INTERACTIVE_TIMEOUT_MS),
+                                                         connection_factory=InstrumentedConnection)
+        conn = replica['pool'].getconn()
+        broken = False
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("pooled replica connection closed")
+            if not conn.autocommit:
+                conn.set_session(readonly=True, autocommit=True)
+            return query(conn)
+        except Exception as e:
+            broken = conn.closed or _is_connection_error(e)
+            raise
+        finally:
+            replica['pool'].putconn(conn, close=broken)
+
+    def replica_status(self):
+        """Health and last measured lag of each configured replica"""
+        return [{'replica': _dsn_host(r['dsn']), 'healthy': r['healthy'], 'lag_seconds': r['lag']}
+                for r in self.replicas]
+
+    def _pick_replica(self):
+        if not self.replicas or time.monotonic() - self.last_write_at < self.read_your_writes_window:
+            return None
+        with self.replica_lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self.replica_index % len(self.replicas)]
+                self.replica_index += 1
+                if self._replica_available(replica):
+                    return replica
+        return None
+
+    def _replica_available(self, replica):
+        now = time.monotonic()
+        if now - replica['checked_at'] < self.replica_check_interval and replica['conn'] is not None:
+            return replica['healthy']
+        replica['checked_at'] = now
+        try:
+            if replica['conn'] is None or replica['conn'].closed:
+                replica['conn'] = psycopg2.connect(replica['dsn'], connect_timeout=2,
+                                                   options=_timeout_options(INTERACTIVE_TIMEOUT_MS),
+                                                   connection_factory=InstrumentedConnection)
+                # Autocommit so idle sessions never hold snapshots that stall replay
+                replica['conn'].set_session(readonly=True, autocommit=True)
+            with replica['conn'].cursor() as cur:
+                cur.execute(REPLICA_LAG_SQL)
+                replica['lag'] = float(cur.fetchone()[0])
+            replica['healthy'] = replica['lag'] <= self.replica_max_lag
+            if not replica['healthy']:
+                logger.warning("Replica %s lags %.1fs, routing reads to primary", _dsn_host(replica['dsn']), replica['lag'])
+        except psycopg2.Error as e:
+            logger.warning("Replica %s unavailable: %s", _dsn_host(replica['dsn']), e)
+            if replica['conn'] is not None:
+                replica['conn'].close()
+            replica['conn'] = None
+            replica['healthy'] = False
+        return replica['healthy']
+
     def ensure_connection(self):
+        if self.conn.closed or time.monotonic() < self.circuit_open_until:
+            self.connect()
+            return
         try:
             with self.conn.cursor() as cur:
                 cur.execute("SELECT 1")
@@ -202,27 +651,130 @@ class Database:
             self.connect()
             self.init_migrations()
 
+    def _use_bulk_timeout(self, cur):
+        """Give the current transaction the bulk-job statement timeout"""
+        cur.execute("SET LOCAL statement_timeout = %s", (BULK_TIMEOUT_MS,))
+
+    @instrumented
     def add_deck(self, deck_data, image_data=None):
+        image_phash = compute_image_hash(image_data) if image_data else None
         self.ensure_connection()
         with self.conn.cursor() as cur:
             try:
                 cur.execute("""
                     INSERT INTO decks (deck_name, manufacturer, release_year, condition,
-                                     purchase_date, purchase_price, notes, image_data)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                                     purchase_date, purchase_price, notes, image_data, image_phash)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                     RETURNING id
                 """, (
                     deck_data['deck_name'], deck_data['manufacturer'],
                     deck_data['release_year'], deck_data['condition'],
                     deck_data['purchase_date'], deck_data['purchase_price'],
-                    deck_data['notes'], image_data
+                    deck_data['notes'], image_data, image_phash
                 ))
-                self.conn.commit()
-                return cur.fetchone()[0]
+                self.commit()
+                deck_id = cur.fetchone()[0]
+                if image_phash is not None:
+                    add_to_image_index(deck_id, image_phash)
+                return deck_id
             except Exception as e:
                 self.conn.rollback()
                 raise Exception(f"Database error: {str(e)}")
 
+    @instrumented
+    def bulk_add_decks(self, decks, chunk_size=100000):
+        """Bulk-load validated deck rows (a DataFrame) with COPY in a single transaction"""
+        self.ensure_connection()
+        columns = ['deck_name', 'manufacturer', 'release_year', 'condition',
+                   'purchase_date', 'purchase_price', 'notes']
+        copy_sql = f"COPY decks ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (condition, notes))"
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                for start in range(0, len(decks), chunk_size):
+                    buffer = io.StringIO()
+                    decks.iloc[start:start + chunk_size][columns].to_csv(
+                        buffer, index=False, header=False, date_format='%Y-%m-%d'
+                    )
+                    buffer.seek(0)
+                    cur.copy_expert(copy_sql, buffer)
+                self.commit()
+                return len(decks)
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Bulk import failed: {str(e)}")
+
+    def _deck_selection(self, deck_ids=None, filters=None):
+        """WHERE clause and params selecting decks by id list and/or column filters.
+
+        Filter values may be a single value or a list (matched with ANY).
+        """
+        clauses = []
+        params = []
+        if deck_ids is not None:
+            clauses.append("id = ANY(%s)")
+            params.append([int(deck_id) for deck_id in deck_ids])
+        for column, value in (filters or {}).items():
+            if column not in DECK_FILTER_COLUMNS:
+                raise Exception(f"Cannot filter decks by {column}")
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} = ANY(%s)")
+                params.append(list(value))
+            else:
+                clauses.append(f"{column} = %s")
+                params.append(value)
+        if not clauses:
+            raise Exception("Bulk deck operations need deck ids or filters")
+        return " AND ".join(clauses), params
+
+    @instrumented
+    def update_decks(self, changes, deck_ids=None, filters=None):
+        """Set the same column values on every selected deck in one UPDATE"""
+        unknown = [column for column in changes if column not in DECK_EDITABLE_COLUMNS]
+        if unknown or not changes:
+            raise Exception(f"Invalid deck changes: {', '.join(unknown) or 'nothing to update'}")
+        where, params = self._deck_selection(deck_ids, filters)
+        assignments = ', '.join(f"{column} = %s" for column in changes)
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                cur.execute(f"UPDATE decks SET {assignments} WHERE {where}", list(changes.values()) + params)
+                updated = cur.rowcount
+                self.commit()
+                return updated
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to update decks: {str(e)}")
+
+    @instrumented
+    def delete_decks(self, deck_ids=None, filters=None):
+        """Delete the selected decks and their market values in one transaction.
+
+        Share memberships and price alerts go with them (ON DELETE CASCADE).
+        """
+        where, params = self._deck_selection(deck_ids, filters)
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                cur.execute(f"SELECT id FROM decks WHERE {where} FOR UPDATE", params)
+                ids = [row[0] for row in cur.fetchall()]
+                if not ids:
+                    self.conn.rollback()
+                    return 0
+
+                cur.execute("DELETE FROM market_values WHERE deck_id = ANY(%s)", (ids,))
+                cur.execute("DELETE FROM decks WHERE id = ANY(%s)", (ids,))
+                deleted = cur.rowcount
+                self.commit()
+                self.image_hash_version += 1
+                return deleted
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to delete decks: {str(e)}")
+
+    @instrumented
     def update_market_value(self, deck_id, market_data):
         self.ensure_connection()
         with self.conn.cursor() as cur:
@@ -244,14 +796,14 @@ class Database:
                     market_data['condition'],
                     market_data.get('notes', '')
                 ))
-                self.conn.commit()
+                self.commit()
                 return cur.fetchone()[0]
             except Exception as e:
                 self.conn.rollback()
                 raise Exception(f"Failed to update market value: {str(e)}")
 
+    @instrumented
     def get_market_values(self, deck_id=None):
-        self.ensure_connection()
         try:
             query = """
                 SELECT mv.*, d.deck_name, d.manufacturer, d.condition as deck_condition, d.purchase_price
@@ -264,10 +816,79 @@ class Database:
                 params.append(deck_id)
             query += " ORDER BY mv.updated_at DESC"
             
-            return pd.read_sql(query, self.conn, params=params)
+            return compact_frame(self.read(lambda conn: pd.read_sql(query, conn, params=params)),
+                                 MARKET_VALUE_FRAME_SCHEMA)
         except Exception as e:
             raise Exception(f"Failed to fetch market values: {str(e)}")
 
+    @instrumented
+    def snapshot_valuations(self, snapshot_date=None):
+        """Record the collection's and each manufacturer's value for snapshot_date (today by default).
+
+        Each deck is valued at its most recent market price, or at its
+        purchase price if it has none. Re-running on the same day overwrites
+        that day's rows. Returns the number of rows written.
+        """
+        snapshot_date = snapshot_date or datetime.now().date()
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                cur.execute("""
+                    WITH latest AS (
+                        SELECT DISTINCT ON (deck_id) deck_id, market_price
+                        FROM market_values
+                        ORDER BY deck_id, updated_at DESC
+                    )
+                    INSERT INTO valuation_snapshots
+                        (scope, scope_key, snapshot_date, deck_count, valued_decks, cost_basis, market_value)
+                    SELECT CASE WHEN GROUPING(d.manufacturer) = 1 THEN 'collection' ELSE 'manufacturer' END,
+                           CASE WHEN GROUPING(d.manufacturer) = 1 THEN '' ELSE d.manufacturer END,
+                           %s,
+                           COUNT(*),
+                           COUNT(l.market_price),
+                           COALESCE(SUM(d.purchase_price), 0),
+                           COALESCE(SUM(COALESCE(l.market_price, d.purchase_price)), 0)
+                    FROM decks d
+                    LEFT JOIN latest l ON l.deck_id = d.id
+                    GROUP BY GROUPING SETS ((), (d.manufacturer))
+                    ON CONFLICT (scope, scope_key, snapshot_date) DO UPDATE SET
+                        deck_count = EXCLUDED.deck_count,
+                        valued_decks = EXCLUDED.valued_decks,
+                        cost_basis = EXCLUDED.cost_basis,
+                        market_value = EXCLUDED.market_value
+                """, (snapshot_date,))
+                written = cur.rowcount
+                self.commit()
+                return written
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to snapshot valuations: {str(e)}")
+
+    @instrumented
+    def get_valuation_history(self, manufacturer=None, start_date=None, end_date=None):
+        """Daily valuations of the whole collection, or of one manufacturer, oldest first"""
+        try:
+            query = """
+                SELECT snapshot_date, deck_count, valued_decks, cost_basis, market_value
+                FROM valuation_snapshots
+                WHERE scope = %s AND scope_key = %s
+            """
+            params = ['manufacturer', manufacturer] if manufacturer else ['collection', '']
+            if start_date:
+                query += " AND snapshot_date >= %s"
+                params.append(start_date)
+            if end_date:
+                query += " AND snapshot_date <= %s"
+                params.append(end_date)
+            query += " ORDER BY snapshot_date"
+
+            return compact_frame(self.read(lambda conn: pd.read_sql(query, conn, params=params)),
+                                 VALUATION_FRAME_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to fetch valuation history: {str(e)}")
+
+    @instrumented
     def add_to_wishlist(self, wishlist_data):
         self.ensure_connection()
         with self.conn.cursor() as cur:
@@ -281,57 +902,341 @@ class Database:
                     wishlist_data['expected_price'], wishlist_data['priority'],
                     wishlist_data['notes']
                 ))
-                self.conn.commit()
+                self.commit()
                 return cur.fetchone()[0]
             except Exception as e:
                 self.conn.rollback()
                 raise Exception(f"Database error: {str(e)}")
 
-    def remove_from_wishlist(self, wishlist_id):
+    @instrumented
+    def remove_from_wishlist(self, wishlist_ids):
+        """Delete one wishlist item or a list of them in a single statement"""
+        if not isinstance(wishlist_ids, (list, tuple, set, pd.Series)):
+            wishlist_ids = [wishlist_ids]
         self.ensure_connection()
         with self.conn.cursor() as cur:
             try:
-                cur.execute("DELETE FROM wishlist WHERE id = %s", (wishlist_id,))
-                self.conn.commit()
-                return True
+                cur.execute("DELETE FROM wishlist WHERE id = ANY(%s)", ([int(i) for i in wishlist_ids],))
+                self.commit()
+                return cur.rowcount
             except Exception as e:
                 self.conn.rollback()
                 raise Exception(f"Failed to remove from wishlist: {str(e)}")
 
-    def get_all_decks(self):
+    @instrumented
+    def update_wishlist_items(self, updates):
+        """Apply edited priority, expected_price and notes for many items in one UPDATE"""
+        rows = [(int(u['id']), int(u['priority']), float(u['expected_price']), u['notes'] or '')
+                for u in updates]
+        if not rows:
+            return 0
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                execute_values(cur, """
+                    UPDATE wishlist SET
+                        priority = v.priority,
+                        expected_price = v.expected_price,
+                        notes = v.notes
+                    FROM (VALUES %s) AS v(id, priority, expected_price, notes)
+                    WHERE wishlist.id = v.id
+                """, rows, template="(%s::integer, %s::integer, %s::decimal, %s::text)", page_size=len(rows))
+                updated = cur.rowcount
+                self.commit()
+                return updated
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to update wishlist: {str(e)}")
+
+    @instrumented
+    def get_wishlist_page(self, limit=50, offset=0, priority=None):
+        """One page of the wishlist with per-priority and total counts in the same query"""
+        query = """
+            SELECT w.*,
+                   COUNT(*) OVER (PARTITION BY priority) AS priority_count,
+                   COUNT(*) OVER () AS total_count
+            FROM wishlist w
+        """
+        params = []
+        if priority:
+            query += " WHERE priority = %s"
+            params.append(priority)
+        query += " ORDER BY priority DESC, created_at DESC LIMIT %s OFFSET %s"
+        params += [limit, offset]
+        try:
+            return self.read(lambda conn: pd.read_sql(query, conn, params=params))
+        except Exception as e:
+            raise Exception(f"Failed to fetch wishlist: {str(e)}")
+
+    @instrumented
+    def match_price_alerts(self, wishlist_ids=None):
+        """Record alerts for market prices below a wishlist item's expected price.
+
+        Incremental by default: only market values updated since the last run's
+        watermark are joined to the wishlist (through the normalized-name
+        indexes). Passing wishlist_ids matches just those items against all
+        current prices instead, e.g. right after they are added or edited.
+        Returns the number of alerts created or updated.
+        """
         self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                if wishlist_ids is None:
+                    cur.execute("SELECT watermark FROM job_watermarks WHERE job = 'price_alerts' FOR UPDATE")
+                    row = cur.fetchone()
+                    since = row[0] if row else None
+                    if since is None:
+                        cur.execute("SELECT MAX(updated_at) FROM market_values")
+                    else:
+                        cur.execute("SELECT MAX(updated_at) FROM market_values WHERE updated_at > %s", (since,))
+                    until = cur.fetchone()[0]
+                    if until is None:
+                        self.conn.rollback()
+                        return 0
+                    condition = "mv.updated_at <= %s"
+                    params = (until,)
+                    if since is not None:
+                        condition += f" AND mv.updated_at > %s - INTERVAL '{ALERT_WATERMARK_OVERLAP}'"
+                        params += (since,)
+                else:
+                    condition = "w.id = ANY(%s)"
+                    params = (list(wishlist_ids),)
+
+                cur.execute(f"""
+                    INSERT INTO price_alerts (wishlist_id, market_value_id, market_price, expected_price)
+                    SELECT w.id, mv.id, mv.market_price, w.expected_price
+                    FROM market_values mv
+                    JOIN decks d ON d.id = mv.deck_id
+                    JOIN wishlist w
+                      ON normalize_name(w.deck_name) = normalize_name(d.deck_name)
+                     AND normalize_name(w.manufacturer) = normalize_name(d.manufacturer)
+                    WHERE {condition}
+                      AND mv.market_price < w.expected_price
+                    ON CONFLICT (wishlist_id, market_value_id) DO UPDATE SET
+                        market_price = EXCLUDED.market_price,
+                        expected_price = EXCLUDED.expected_price,
+                        dismissed = price_alerts.dismissed AND EXCLUDED.market_price >= price_alerts.market_price,
+                        created_at = CURRENT_TIMESTAMP
+                    WHERE price_alerts.market_price <> EXCLUDED.market_price
+                       OR price_alerts.expected_price <> EXCLUDED.expected_price
+                """, params)
+                matched = cur.rowcount
+
+                if wishlist_ids is None:
+                    cur.execute("""
+                        INSERT INTO job_watermarks (job, watermark) VALUES ('price_alerts', %s)
+                        ON CONFLICT (job) DO UPDATE SET watermark = EXCLUDED.watermark
+                    """, (until,))
+                self.commit()
+                return matched
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to match price alerts: {str(e)}")
+
+    @instrumented
+    def get_price_alerts(self):
+        """Undismissed alerts whose market price is still below the expected price"""
         try:
-            return pd.read_sql("""
-                SELECT * FROM decks 
+            return self.read(lambda conn: pd.read_sql("""
+                SELECT pa.id, pa.wishlist_id, w.deck_name, w.manufacturer, w.expected_price,
+                       mv.market_price, mv.source, mv.condition, mv.updated_at
+                FROM price_alerts pa
+                JOIN wishlist w ON w.id = pa.wishlist_id
+                JOIN market_values mv ON mv.id = pa.market_value_id
+                WHERE NOT pa.dismissed AND mv.market_price < w.expected_price
+                ORDER BY w.expected_price - mv.market_price DESC
+            """, conn))
+        except Exception as e:
+            raise Exception(f"Failed to fetch price alerts: {str(e)}")
+
+    @instrumented
+    def dismiss_price_alerts(self, alert_ids):
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                cur.execute("UPDATE price_alerts SET dismissed = true WHERE id = ANY(%s)", (list(alert_ids),))
+                self.commit()
+                return cur.rowcount
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to dismiss price alerts: {str(e)}")
+
+    @instrumented
+    def get_all_decks(self):
+        """Every deck without its image, in compact dtypes"""
+        try:
+            return compact_frame(self.read(lambda conn: pd.read_sql("""
+                SELECT id, deck_name, manufacturer, release_year, condition,
+                       purchase_date, purchase_price, notes, created_at
+                FROM decks
                 ORDER BY created_at DESC
-            """, self.conn)
+            """, conn)), DECK_FRAME_SCHEMA)
         except Exception as e:
             raise Exception(f"Failed to fetch decks: {str(e)}")
 
+    @instrumented
+    def get_deck_identities(self):
+        """Only the columns duplicate detection needs, for every deck"""
+        try:
+            return self.read(lambda conn: pd.read_sql("""
+                SELECT id, deck_name, manufacturer FROM decks
+                ORDER BY id
+            """, conn))
+        except Exception as e:
+            raise Exception(f"Failed to fetch deck names: {str(e)}")
+
+    @instrumented
     def get_wishlist(self):
-        self.ensure_connection()
         try:
-            return pd.read_sql("""
+            return compact_frame(self.read(lambda conn: pd.read_sql("""
                 SELECT * FROM wishlist
                 ORDER BY priority DESC, created_at DESC
-            """, self.conn)
+            """, conn)), WISHLIST_FRAME_SCHEMA)
         except Exception as e:
             raise Exception(f"Failed to fetch wishlist: {str(e)}")
 
+    @instrumented
     def get_deck_image(self, deck_id):
-        self.ensure_connection()
-        with self.conn.cursor() as cur:
-            try:
+        def query(conn):
+            with conn.cursor() as cur:
                 cur.execute("SELECT image_data FROM decks WHERE id = %s", (deck_id,))
                 result = cur.fetchone()
                 return result[0] if result else None
-            except Exception as e:
-                raise Exception(f"Failed to fetch deck image: {str(e)}")
 
-    def search_decks(self, query):
+        try:
+            return self.read(query)
+        except Exception as e:
+            raise Exception(f"Failed to fetch deck image: {str(e)}")
+
+    @instrumented
+    def get_image_hashes(self):
+        """(id, image_phash) of every deck with a hashed image"""
+        try:
+            return self.read(lambda conn: pd.read_sql("""
+                SELECT id, image_phash FROM decks
+                WHERE image_phash IS NOT NULL
+            """, conn))
+        except Exception as e:
+            raise Exception(f"Failed to fetch image hashes: {str(e)}")
+
+    def iter_images_without_hash(self, batch_size=500):
+        """Yield batches of (id, image_data) for images with no image_phash yet.
+
+        Images already found undecodable are skipped. Streams on its own
+        connection so the caller can write hashes back through this object
+        while iterating.
+        """
+        for rows, _ in self._stream('images_without_hash', """
+            SELECT id, image_data FROM decks
+            WHERE image_phash IS NULL AND image_data IS NOT NULL AND NOT image_hash_failed
+        """, itersize=batch_size):
+            yield [(row[0], bytes(row[1])) for row in rows]
+
+    def iter_decks(self, chunk_size=STREAM_ITERSIZE):
+        """get_all_decks as a stream of DataFrame chunks"""
+        return self._stream_frames('iter_decks', """
+            SELECT id, deck_name, manufacturer, release_year, condition,
+                   purchase_date, purchase_price, notes, created_at
+            FROM decks
+            ORDER BY created_at DESC
+        """, None, chunk_size, DECK_FRAME_SCHEMA)
+
+    def iter_market_values(self, deck_id=None, chunk_size=STREAM_ITERSIZE):
+        """get_market_values as a stream of DataFrame chunks"""
+        query = """
+            SELECT mv.*, d.deck_name, d.manufacturer, d.condition as deck_condition, d.purchase_price
+            FROM market_values mv
+            JOIN decks d ON mv.deck_id = d.id
+        """
+        params = []
+        if deck_id:
+            query += " WHERE mv.deck_id = %s"
+            params.append(deck_id)
+        query += " ORDER BY mv.updated_at DESC"
+        return self._stream_frames('iter_market_values', query, params, chunk_size, MARKET_VALUE_FRAME_SCHEMA)
+
+    def iter_active_shared_collections(self, chunk_size=STREAM_ITERSIZE):
+        """get_active_shared_collections as a stream of DataFrame chunks"""
+        return self._stream_frames('iter_active_shared_collections',
+                                   ACTIVE_SHARES_SQL, None, chunk_size)
+
+    def iter_search_decks(self, query, batch_size=1000):
+        """search_decks as a stream of row-dict batches"""
+        for rows, _ in self._stream('iter_search_decks', """
+            SELECT * FROM decks
+            WHERE deck_name ILIKE %s
+            OR manufacturer ILIKE %s
+            OR notes ILIKE %s
+        """, (f'%{query}%', f'%{query}%', f'%{query}%'), batch_size, RealDictCursor):
+            yield rows
+
+    def _stream(self, name, query, params=None, itersize=STREAM_ITERSIZE, cursor_factory=None):
+        """Yield (rows, column names) batches from a server-side cursor.
+
+        The cursor runs on a dedicated read-only connection, so only one
+        batch of itersize rows is held client-side at a time.
+        """
+        conn = self.new_connection()
+        try:
+            conn.set_session(readonly=True)
+            with conn.cursor(name=name, cursor_factory=cursor_factory) as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(itersize)
+                    if not rows:
+                        break
+                    yield rows, [column[0] for column in cur.description]
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _stream_frames(self, name, query, params, chunk_size, schema=None):
+        for rows, columns in self._stream(name, query, params, chunk_size):
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            yield compact_frame(chunk, schema) if schema else chunk
+
+    @instrumented
+    def set_image_hashes(self, hashes):
+        """Store (deck_id, image_phash) pairs in one UPDATE; a None hash marks the image undecodable"""
+        if not hashes:
+            return 0
         self.ensure_connection()
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self.conn.cursor() as cur:
             try:
+                self._use_bulk_timeout(cur)
+                execute_values(cur, """
+                    UPDATE decks SET image_phash = v.image_phash, image_hash_failed = v.image_phash IS NULL
+                    FROM (VALUES %s) AS v(id, image_phash)
+                    WHERE decks.id = v.id
+                """, hashes, template="(%s::integer, %s::bigint)", page_size=len(hashes))
+                updated = cur.rowcount
+                self.commit()
+                self.image_hash_version += 1
+                return updated
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to store image hashes: {str(e)}")
+
+    @instrumented
+    def get_decks_by_ids(self, deck_ids):
+        """Full deck rows for the given ids, in the order given"""
+        def query(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM decks WHERE id = ANY(%s)", ([int(i) for i in deck_ids],))
+                decks = {deck['id']: deck for deck in cur.fetchall()}
+            return [decks[int(i)] for i in deck_ids if int(i) in decks]
+
+        try:
+            return self.read(query)
+        except Exception as e:
+            raise Exception(f"Failed to fetch decks: {str(e)}")
+
+    @instrumented
+    def search_decks(self, query):
+        def search(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
                     SELECT * FROM decks 
                     WHERE deck_name ILIKE %s 
@@ -339,8 +1244,11 @@ class Database:
                     OR notes ILIKE %s
                 """, (f'%{query}%', f'%{query}%', f'%{query}%'))
                 return cur.fetchall()
-            except Exception as e:
-                raise Exception(f"Search failed: {str(e)}")
+
+        try:
+            return self.read(search)
+        except Exception as e:
+            raise Exception(f"Search failed: {str(e)}")
 
     def get_current_schema_version(self):
         """Get the current schema version"""
@@ -349,61 +1257,266 @@ class Database:
             cur.execute("SELECT MAX(version) FROM schema_migrations WHERE status = 'completed'")
             return cur.fetchone()[0] or 0
 
+    @instrumented
     def create_shared_collection(self, name, deck_ids, description=None, expires_at=None, is_public=False):
         self.ensure_connection()
         with self.conn.cursor() as cur:
             try:
                 cur.execute("""
-                    INSERT INTO shared_collections (name, description, deck_ids, expires_at, is_public)
-                    VALUES (%s, %s, %s, %s, %s)
-                    RETURNING share_id
-                """, (name, description, deck_ids, expires_at, is_public))
-                self.conn.commit()
-                return cur.fetchone()[0]
+                    INSERT INTO shared_collections (name, description, expires_at, is_public)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id, share_id
+                """, (name, description, expires_at, is_public))
+                collection_id, share_id = cur.fetchone()
+                execute_values(cur, """
+                    INSERT INTO shared_collection_decks (collection_id, deck_id, position) VALUES %s
+                """, [(collection_id, int(deck_id), position) for position, deck_id in enumerate(deck_ids, start=1)],
+                    page_size=1000)
+                self.commit()
+                return share_id
             except Exception as e:
                 self.conn.rollback()
                 raise Exception(f"Failed to create shared collection: {str(e)}")
 
-    def get_shared_collection(self, share_id):
+    @instrumented
+    def get_shared_collection(self, share_id, limit=None, offset=0):
+        """A live share with deck_count and one page of its decks, fetched in one round trip.
+
+        limit=None returns every deck.
+        """
+        def query(conn):
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT sc.*,
+                           (SELECT COUNT(*) FROM shared_collection_decks
+                            WHERE collection_id = sc.id) AS deck_count,
+                           d.id AS deck__id, d.deck_name AS deck__deck_name,
+                           d.manufacturer AS deck__manufacturer, d.release_year AS deck__release_year,
+                           d.condition AS deck__condition, d.purchase_date AS deck__purchase_date,
+                           d.notes AS deck__notes, d.created_at AS deck__created_at
+                    FROM shared_collections sc
+                    LEFT JOIN LATERAL (
+                        SELECT d.* FROM shared_collection_decks scd
+                        JOIN decks d ON d.id = scd.deck_id
+                        WHERE scd.collection_id = sc.id
+                        ORDER BY scd.position
+                        LIMIT %s OFFSET %s
+                    ) d ON true
+                    WHERE sc.share_id = %s AND (sc.expires_at IS NULL OR sc.expires_at > CURRENT_TIMESTAMP)
+                """, (limit, offset, share_id))
+                return _split_share_rows(cur.fetchall())
+
+        try:
+            return self.read(query)
+        except Exception as e:
+            raise Exception(f"Failed to fetch shared collection: {str(e)}")
+
+    @instrumented
+    def get_active_shared_collections(self):
+        try:
+            return self.read(lambda conn: pd.read_sql(ACTIVE_SHARES_SQL, conn))
+        except Exception as e:
+            raise Exception(f"Failed to fetch shared collections: {str(e)}")
+
+    @instrumented
+    def get_shares_for_decks(self, deck_ids):
+        """Active shares containing any of deck_ids, with how many of them each holds"""
+        try:
+            return self.read(lambda conn: pd.read_sql("""
+                SELECT sc.id, sc.share_id, sc.name, COUNT(*) AS matching_decks
+                FROM shared_collection_decks scd
+                JOIN shared_collections sc ON sc.id = scd.collection_id
+                WHERE scd.deck_id = ANY(%s)
+                  AND (sc.expires_at IS NULL OR sc.expires_at > CURRENT_TIMESTAMP)
+                GROUP BY sc.id
+                ORDER BY sc.name
+            """, conn, params=([int(deck_id) for deck_id in deck_ids],)))
+        except Exception as e:
+            raise Exception(f"Failed to fetch shares for decks: {str(e)}")
+
+    @instrumented
+    def purge_expired_shares(self, batch_size=1000):
+        """Delete expired shares and their memberships, committing every batch_size shares"""
+        deleted = 0
         self.ensure_connection()
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self.conn.cursor() as cur:
             try:
-                # Get shared collection details
-                cur.execute("""
-                    SELECT * FROM shared_collections 
-                    WHERE share_id = %s AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
-                """, (share_id,))
-                collection = cur.fetchone()
-                
-                if not collection:
-                    return None
-                
-                # Get associated decks
-                deck_ids = collection['deck_ids']
-                if deck_ids:
+                while True:
+                    self._use_bulk_timeout(cur)
                     cur.execute("""
-                        SELECT id, deck_name, manufacturer, release_year, condition, 
-                               purchase_date, notes, created_at
-                        FROM decks 
-                        WHERE id = ANY(%s)
-                    """, (deck_ids,))
-                    collection['decks'] = cur.fetchall()
-                else:
-                    collection['decks'] = []
-                
-                return collection
+                        DELETE FROM shared_collections WHERE id IN (
+                            SELECT id FROM shared_collections
+                            WHERE expires_at <= CURRENT_TIMESTAMP
+                            ORDER BY id
+                            LIMIT %s
+                        )
+                    """, (batch_size,))
+                    batch = cur.rowcount
+                    self.commit()
+                    deleted += batch
+                    if batch < batch_size:
+                        return deleted
             except Exception as e:
-                raise Exception(f"Failed to fetch shared collection: {str(e)}")
+                self.conn.rollback()
+                raise Exception(f"Failed to purge expired shares: {str(e)}")
 
-    def get_active_shared_collections(self):
+    @instrumented
+    def purge_failed_migrations(self):
+        """Remove failed or abandoned migration rows so those versions can be retried"""
         self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                cur.execute("""
+                    DELETE FROM schema_migrations WHERE status <> 'completed'
+                    RETURNING version
+                """)
+                versions = sorted(row[0] for row in cur.fetchall())
+                self.commit()
+                return versions
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to purge migrations: {str(e)}")
+
+    @instrumented
+    def purge_dismissed_alerts(self, retention_days=30):
+        """Delete price alerts dismissed more than retention_days ago"""
+        self.ensure_connection()
+        with self.conn.cursor() as cur:
+            try:
+                self._use_bulk_timeout(cur)
+                cur.execute("""
+                    DELETE FROM price_alerts
+                    WHERE dismissed AND created_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                """, (retention_days,))
+                deleted = cur.rowcount
+                self.commit()
+                return deleted
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Failed to purge price alerts: {str(e)}")
+
+    @instrumented
+    def refresh_materialized_views(self):
+        """Refresh every materialized view in the schema, concurrently where a unique index allows"""
+        conn = self.new_connection()
+        conn.autocommit = True
         try:
-            return pd.read_sql("""
-                SELECT * FROM shared_collections
-                WHERE expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP
-                ORDER BY created_at DESC
-            """, self.conn)
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT m.matviewname, m.ispopulated AND EXISTS (
+                        SELECT 1 FROM pg_index i
+                        WHERE i.indrelid = format('%I.%I', m.schemaname, m.matviewname)::regclass
+                          AND i.indisunique
+                    )
+                    FROM pg_matviews m
+                    WHERE m.schemaname = current_schema()
+                    ORDER BY m.matviewname
+                """)
+                views = cur.fetchall()
+                for view, concurrently in views:
+                    cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}{}").format(
+                        sql.SQL("CONCURRENTLY ") if concurrently else sql.SQL(""), sql.Identifier(view)))
+            return [view for view, _ in views]
         except Exception as e:
-            raise Exception(f"Failed to fetch shared collections: {str(e)}")
+            raise Exception(f"Failed to refresh materialized views: {str(e)}")
+        finally:
+            conn.close()
+
+    @instrumented
+    def vacuum_analyze(self, min_dead_tuples=1000, min_dead_ratio=0.1, max_tables=5):
+        """VACUUM (ANALYZE) the tables with the most dead rows and ANALYZE those with stale statistics.
+
+        Returns one dict per table touched with the action taken and the
+        dead/modified row counts that triggered it.
+        """
+        conn = self.new_connection()
+        conn.autocommit = True  # VACUUM cannot run inside a transaction
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT relname AS table_name, n_dead_tup AS dead_rows, n_mod_since_analyze AS modified_rows,
+                           CASE WHEN n_dead_tup >= %(min_dead)s
+                                 AND n_dead_tup >= %(ratio)s * GREATEST(n_live_tup, 1)
+                                THEN 'vacuum' ELSE 'analyze' END AS action
+                    FROM pg_stat_user_tables
+                    WHERE schemaname = current_schema()
+                      AND ((n_dead_tup >= %(min_dead)s AND n_dead_tup >= %(ratio)s * GREATEST(n_live_tup, 1))
+                           OR (n_mod_since_analyze >= %(min_dead)s
+                               AND n_mod_since_analyze >= %(ratio)s * GREATEST(n_live_tup, 1)))
+                    ORDER BY n_dead_tup + n_mod_since_analyze DESC
+                    LIMIT %(limit)s
+                """, {'min_dead': min_dead_tuples, 'ratio': min_dead_ratio, 'limit': max_tables})
+                tables = cur.fetchall()
+                for table in tables:
+                    statement = "VACUUM (ANALYZE) {}" if table['action'] == 'vacuum' else "ANALYZE {}"
+                    cur.execute(sql.SQL(statement).format(sql.Identifier(table['table_name'])))
+            return [dict(table) for table in tables]
+        except Exception as e:
+            raise Exception(f"Failed to vacuum tables: {str(e)}")
+        finally:
+            conn.close()
+
+def _split_share_rows(rows):
+    """Fold share-joined-to-deck rows into one collection dict with a decks list"""
+    if not rows:
+        return None
+    collection = {key: value for key, value in rows[0].items() if not key.startswith('deck__')}
+    collection['decks'] = [
+        {key[len('deck__'):]: value for key, value in row.items() if key.startswith('deck__')}
+        for row in rows if row['deck__id'] is not None
+    ]
+    return collection
+
+def _timeout_options(statement_timeout_ms):
+    """libpq options setting per-session statement and lock timeouts"""
+    return f"-c statement_timeout={statement_timeout_ms} -c lock_timeout={LOCK_TIMEOUT_MS}"
+
+def _is_connection_error(error):
+    """True if error, or anything it was raised from, is a lost-connection error"""
+    while error is not None:
+        if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _dsn_host(dsn):
+    """Replica identifier for logs that never includes the password"""
+    try:
+        params = psycopg2.extensions.parse_dsn(dsn)
+        return f"{params.get('host', 'localhost')}:{params.get('port', 5432)}"
+    except psycopg2.ProgrammingError:
+        return '<invalid dsn>'
+
+# Postgres connection handling with no SQLite counterpart; every other public
+# method must exist on both backends with the same parameters
+POSTGRES_ONLY_METHODS = {'commit', 'connect', 'connection_params', 'init_replicas'}
+
+def backend_parity_problems():
+    """Differences between the public methods of Database and SQLiteDatabase"""
+    from sqlite_database import SQLiteDatabase
+
+    def public_methods(cls):
+        return {name: member for name, member in inspect.getmembers(cls, callable) if not name.startswith('_')}
+
+    postgres, sqlite = public_methods(Database), public_methods(SQLiteDatabase)
+    problems = [f"{name} is missing from SQLiteDatabase" for name in sorted(postgres.keys() - sqlite.keys() - POSTGRES_ONLY_METHODS)]
+    problems += [f"{name} is missing from Database" for name in sorted(sqlite.keys() - postgres.keys())]
+    for name in sorted(postgres.keys() & sqlite.keys()):
+        postgres_params = list(inspect.signature(postgres[name]).parameters)
+        sqlite_params = list(inspect.signature(sqlite[name]).parameters)
+        if postgres_params != sqlite_params:
+            problems.append(f"{name} takes ({', '.join(postgres_params)}) on Database "
+                            f"but ({', '.join(sqlite_params)}) on SQLiteDatabase")
+    return problems
+
+def create_database():
+    """Postgres by default; an embedded SQLite file when DATABASE_BACKEND=sqlite"""
+    problems = backend_parity_problems()
+    if problems:
+        raise TypeError(f"Database backends have diverged: {'; '.join(problems)}")
+    if os.environ.get('DATABASE_BACKEND', 'postgres').lower() == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(os.environ.get('SQLITE_PATH', 'collection.db'))
+    return Database()
 
-db = Database()
+db = create_database()
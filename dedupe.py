@@ -0,0 +1,141 @@
+"""Duplicate detection for bulk imports.
+
+Deck names and manufacturers are normalized (case, accents, punctuation,
+whitespace and filler words such as "playing cards") and compared in two
+stages:
+
+* exact duplicates share a normalized (manufacturer, deck name) key and are
+  found with a hash lookup;
+* near duplicates use the sorted-neighbourhood method: records are sorted by
+  two blocking keys and only neighbours within a small window are compared
+  with trigram similarity, which keeps the work at O(n log n) rather than
+  comparing every pair.
+
+Rows of the uploaded file are checked against each other and against the
+existing collection.
+"""
+import re
+import unicodedata
+import pandas as pd
+
+FILLER_WORDS = {'the', 'of', 'and', 'deck', 'decks', 'playing', 'card', 'cards'}
+NEAR_DUPLICATE_THRESHOLD = 0.8
+WINDOW_SIZE = 6
+
+DUPLICATE_COLUMNS = ['row', 'deck_name', 'manufacturer', 'match_type', 'matched_against',
+                     'matched_ref', 'matched_name', 'score']
+
+def normalize_name(text):
+    """Lower-case, accent-free, punctuation-free form of a name for matching.
+
+    The database's normalize_name() SQL function (migration 12) implements the
+    same steps, so keep the two and FILLER_WORDS in step.
+    """
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ''
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    text = re.sub(r"['\u2019]", '', text)  # "Jerry's" -> "jerrys"
+    tokens = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    meaningful = [token for token in tokens if token not in FILLER_WORDS]
+    return ' '.join(meaningful or tokens)
+
+def trigrams(text):
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def find_duplicates(new_decks, existing_decks, threshold=NEAR_DUPLICATE_THRESHOLD, window=WINDOW_SIZE):
+    """Flag rows of new_decks that duplicate each other or the existing collection.
+
+    new_decks needs deck_name and manufacturer columns; existing_decks also
+    needs id. Returns one row per flagged import row (its best match), with
+    ``row`` being the position in new_decks.
+    """
+    new_names = [normalize_name(name) for name in new_decks['deck_name']]
+    new_makers = [normalize_name(maker) for maker in new_decks['manufacturer']]
+    old_names = [normalize_name(name) for name in existing_decks['deck_name']]
+    old_makers = [normalize_name(maker) for maker in existing_decks['manufacturer']]
+    old_ids = existing_decks['id'].tolist()
+
+    matches = {}
+
+    # Exact duplicates: hash lookup on the normalized key
+    collection_keys = {}
+    for deck_id, name, maker in zip(old_ids, old_names, old_makers):
+        collection_keys.setdefault((maker, name), deck_id)
+    file_keys = {}
+    for row, key in enumerate(zip(new_makers, new_names)):
+        if key in collection_keys:
+            matches[row] = ('exact', 'collection', collection_keys[key], 1.0)
+        elif key in file_keys:
+            matches[row] = ('exact', 'file', file_keys[key], 1.0)
+        else:
+            file_keys[key] = row
+
+    # Near duplicates: sorted neighbourhood over two blocking keys
+    records = [('file', row, maker, name) for row, (maker, name) in enumerate(zip(new_makers, new_names))]
+    records += [('collection', deck_id, maker, name) for deck_id, maker, name in zip(old_ids, old_makers, old_names)]
+    grams = [trigrams(f"{maker} {name}") for _, _, maker, name in records]
+    blocking_keys = [
+        lambda r: (records[r][2], records[r][3]),
+        lambda r: (' '.join(sorted(records[r][3].split())), records[r][2]),
+    ]
+    for blocking_key in blocking_keys:
+        order = sorted(range(len(records)), key=blocking_key)
+        for position, current in enumerate(order):
+            for other in order[position + 1:position + window]:
+                _consider_pair(records, grams, current, other, matches, threshold)
+
+    collection_names = dict(zip(old_ids, existing_decks['deck_name']))
+    flagged = []
+    for row, (match_type, matched_against, ref, score) in sorted(matches.items()):
+        flagged.append({
+            'row': row,
+            'deck_name': new_decks['deck_name'].iloc[row],
+            'manufacturer': new_decks['manufacturer'].iloc[row],
+            'match_type': match_type,
+            'matched_against': matched_against,
+            'matched_ref': ref,
+            'matched_name': collection_names[ref] if matched_against == 'collection' else new_decks['deck_name'].iloc[ref],
+            'score': round(score, 3)
+        })
+    return pd.DataFrame(flagged, columns=DUPLICATE_COLUMNS)
+
+def _consider_pair(records, grams, a, b, matches, threshold):
+    source_a, ref_a = records[a][:2]
+    source_b, ref_b = records[b][:2]
+    if source_a == 'collection' and source_b == 'collection':
+        return
+    # The flagged row is always a file row; between two file rows it is the later one
+    if source_a == 'collection' or (source_b == 'file' and ref_b > ref_a):
+        (source_a, ref_a, a), (source_b, ref_b, b) = (source_b, ref_b, b), (source_a, ref_a, a)
+    existing = matches.get(ref_a)
+    if existing is not None and existing[0] == 'exact':
+        return
+    score = similarity(grams[a], grams[b])
+    if score >= threshold and (existing is None or score > existing[3]):
+        matches[ref_a] = ('near', source_b, ref_b, score)
+
+def summarize_duplicates(duplicates, total_rows):
+    """Counts shown to the user before committing an import"""
+    counts = duplicates.groupby(['match_type', 'matched_against']).size()
+    return {
+        'total_rows': total_rows,
+        'exact_in_file': int(counts.get(('exact', 'file'), 0)),
+        'exact_in_collection': int(counts.get(('exact', 'collection'), 0)),
+        'near_in_file': int(counts.get(('near', 'file'), 0)),
+        'near_in_collection': int(counts.get(('near', 'collection'), 0)),
+        'unique_rows': total_rows - len(duplicates)
+    }
+
+def drop_duplicates(decks, duplicates, skip_exact=True, skip_near=False):
+    """Remove flagged rows from an import; in-file duplicates keep their first occurrence"""
+    skipped_types = [match_type for match_type, skip in (('exact', skip_exact), ('near', skip_near)) if skip]
+    skipped_rows = duplicates.loc[duplicates['match_type'].isin(skipped_types), 'row']
+    return decks.drop(index=decks.index[skipped_rows.to_numpy()]).reset_index(drop=True)
@@ -0,0 +1,45 @@
+"""Typed database errors.
+
+Database methods keep their human-readable messages, but failures caused by
+an unreachable database or a cancelled statement are re-raised as these
+subclasses so callers can tell "try again later" from a real bug. All of
+them are still plain Exceptions, so existing ``except Exception`` handlers
+keep working.
+"""
+import sqlite3
+import psycopg2
+from psycopg2 import errorcodes
+
+class DatabaseError(Exception):
+    """Base class for typed database failures"""
+
+class DatabaseUnavailableError(DatabaseError):
+    """The database cannot be reached, or the circuit breaker is open"""
+
+class QueryTimeoutError(DatabaseError):
+    """A statement hit its statement or lock timeout"""
+
+TIMEOUT_SQLSTATES = {errorcodes.QUERY_CANCELED, errorcodes.LOCK_NOT_AVAILABLE}
+
+def classify_error(error):
+    """The typed error class for error (or anything it was raised from), or None"""
+    while error is not None:
+        if isinstance(error, DatabaseError):
+            return type(error)
+        if isinstance(error, psycopg2.Error) and error.pgcode in TIMEOUT_SQLSTATES:
+            return QueryTimeoutError
+        if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)) and error.pgcode is None:
+            return DatabaseUnavailableError
+        if isinstance(error, sqlite3.OperationalError) and str(error) in ('interrupted', 'database is locked'):
+            return QueryTimeoutError
+        error = error.__cause__ or error.__context__
+    return None
+
+def typed_error(error):
+    """error re-raised as its typed class, keeping the original message"""
+    error_class = classify_error(error)
+    if error_class is None or isinstance(error, error_class):
+        return error
+    typed = error_class(str(error))
+    typed.__cause__ = error
+    return typed
@@ -0,0 +1,115 @@
+"""Perceptual-hash image index.
+
+Every deck image gets a 64-bit dHash (utils.compute_image_hash) stored in
+decks.image_phash. Lookups load all hashes into a NumPy uint64 array once
+and answer "which decks look like this photo" with a vectorized XOR +
+popcount Hamming-distance scan, which takes a few milliseconds even at a
+million images.
+
+Backfill hashes for images stored before the column existed with:
+    python image_index.py backfill [--workers 4] [--batch-size 500]
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils import compute_image_hash
+
+DUPLICATE_DISTANCE = 6   # bits; near-certain re-upload of the same image
+SIMILAR_DISTANCE = 12    # bits; same deck photographed differently
+INDEX_TTL_SECONDS = 300  # also pick up hashes written by other processes
+
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+def hamming_distances(hashes, image_hash):
+    """Bit distance between every hash in a uint64 array and one hash"""
+    xor = hashes ^ np.array(image_hash, dtype=np.int64).view(np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(xor)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+class ImageHashIndex:
+    def __init__(self, deck_ids, hashes):
+        self.deck_ids = np.asarray(deck_ids, dtype=np.int64)
+        self.hashes = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+
+    def __len__(self):
+        return len(self.deck_ids)
+
+    def query(self, image_hash, max_distance=SIMILAR_DISTANCE, limit=10):
+        """Closest decks as (deck_id, distance) pairs, nearest first"""
+        if not len(self):
+            return []
+        distances = hamming_distances(self.hashes, image_hash)
+        candidates = np.flatnonzero(distances <= max_distance)
+        nearest = candidates[np.argsort(distances[candidates], kind='stable')][:limit]
+        return [(int(self.deck_ids[i]), int(distances[i])) for i in nearest]
+
+_cache = {'index': None, 'version': None, 'loaded_at': 0.0}
+_cache_lock = threading.Lock()
+
+def get_image_index(db):
+    """Shared in-process index, rebuilt after bulk hash changes or when the TTL expires"""
+    with _cache_lock:
+        stale = (_cache['index'] is None
+                 or _cache['version'] != db.image_hash_version
+                 or time.monotonic() - _cache['loaded_at'] > INDEX_TTL_SECONDS)
+        if stale:
+            hashes_df = db.get_image_hashes()
+            _cache['index'] = ImageHashIndex(hashes_df['id'], hashes_df['image_phash'])
+            _cache['version'] = db.image_hash_version
+            _cache['loaded_at'] = time.monotonic()
+        return _cache['index']
+
+def add_to_image_index(deck_id, image_hash):
+    """Append one newly stored hash to the loaded index instead of reloading it"""
+    with _cache_lock:
+        index = _cache['index']
+        if index is not None:
+            # A new index object, so queries already holding the old one are unaffected
+            _cache['index'] = ImageHashIndex(np.append(index.deck_ids, deck_id),
+                                             np.append(index.hashes.view(np.int64), image_hash))
+
+def find_similar_decks(db, image_data, max_distance=SIMILAR_DISTANCE, limit=10):
+    """(deck_id, distance) pairs for decks whose image looks like image_data"""
+    return get_image_index(db).query(compute_image_hash(image_data), max_distance, limit)
+
+def _safe_image_hash(image_data):
+    try:
+        return compute_image_hash(image_data)
+    except Exception:
+        return None
+
+def backfill_image_hashes(db, batch_size=500, workers=None):
+    """Hash stored images that have no image_phash yet, in parallel worker processes"""
+    hashed = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in db.iter_images_without_hash(batch_size):
+            hashes = executor.map(_safe_image_hash, [image_data for _, image_data in rows], chunksize=16)
+            # Unreadable images are stored with a None hash, which marks them
+            # so later runs don't fetch and decode them again
+            pairs = [(deck_id, image_hash) for (deck_id, _), image_hash in zip(rows, hashes)]
+            db.set_image_hashes(pairs)
+            unreadable = sum(image_hash is None for _, image_hash in pairs)
+            failed += unreadable
+            hashed += len(pairs) - unreadable
+    return hashed, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the perceptual-hash image index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help="Hash images stored without a hash")
+    backfill_parser.add_argument('--batch-size', type=int, default=500)
+    backfill_parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    from database import db
+
+    start = time.perf_counter()
+    hashed, failed = backfill_image_hashes(db, batch_size=args.batch_size, workers=args.workers)
+    print(f"Hashed {hashed} images in {time.perf_counter() - start:.1f}s ({failed} unreadable)")
+
+if __name__ == "__main__":
+    main()
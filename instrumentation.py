@@ -0,0 +1,277 @@
+"""Query instrumentation for the Database class.
+
+Two layers feed a process-wide QueryStats instance:
+
+* ``instrumented`` wraps Database methods and records per-method latency
+  histograms plus the rows and bytes each call returned.
+* ``InstrumentedConnection`` is used as the psycopg2 connection factory; its
+  cursors time every statement and log the SQL and its EXPLAIN plan when a
+  statement exceeds the slow-query threshold (``SLOW_QUERY_MS``).
+
+``time_statements`` additionally totals the statements of one block of code,
+such as a profiled page render.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+from psycopg2.extensions import connection, cursor
+from errors import typed_error
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf')]
+SLOW_QUERY_LOG_SIZE = 100
+SLOW_QUERY_SQL_CHARS = 2000  # logged SQL text is cut to this length
+MOGRIFIED_SQL_CHARS = 200  # and mogrified SQL, whose values are inlined, to this
+
+class QueryStats:
+    def __init__(self, slow_query_ms=500):
+        self.lock = threading.Lock()
+        self.slow_query_ms = slow_query_ms
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+            self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+            self.statement_count = 0
+            self.statement_ms = 0.0
+            self.started_at = time.time()
+
+    def record_call(self, method, elapsed_ms, rows=0, nbytes=0, failed=False):
+        with self.lock:
+            stats = self.methods.setdefault(method, {
+                'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'rows': 0, 'bytes': 0, 'buckets': [0] * len(LATENCY_BUCKETS_MS)
+            })
+            stats['calls'] += 1
+            stats['errors'] += int(failed)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['rows'] += rows
+            stats['bytes'] += nbytes
+            stats['buckets'][_bucket_index(elapsed_ms)] += 1
+
+    def record_statement(self, sql, elapsed_ms, plan=None):
+        """Count a statement; slow ones (with a plan) are kept with their parameterized SQL"""
+        with self.lock:
+            self.statement_count += 1
+            self.statement_ms += elapsed_ms
+            timer = _statement_timer.get()
+            if timer is not None:
+                timer['statements'] += 1
+                timer['ms'] += elapsed_ms
+            if plan is not None:
+                self.slow_queries.append({
+                    'logged_at': time.time(),
+                    'elapsed_ms': elapsed_ms,
+                    'sql': truncate_sql(sql),
+                    'plan': plan
+                })
+
+    def method_summary(self):
+        """Per-method statistics as a DataFrame, slowest total time first"""
+        with self.lock:
+            rows = []
+            for method, stats in self.methods.items():
+                rows.append({
+                    'method': method,
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'total_ms': stats['total_ms'],
+                    'mean_ms': stats['total_ms'] / stats['calls'],
+                    'p50_ms': _histogram_percentile(stats['buckets'], 0.50, stats['max_ms']),
+                    'p95_ms': _histogram_percentile(stats['buckets'], 0.95, stats['max_ms']),
+                    'p99_ms': _histogram_percentile(stats['buckets'], 0.99, stats['max_ms']),
+                    'max_ms': stats['max_ms'],
+                    'rows': stats['rows'],
+                    'bytes': stats['bytes']
+                })
+        if not rows:
+            return pd.DataFrame(columns=['method', 'calls', 'errors', 'total_ms', 'mean_ms', 'p50_ms',
+                                         'p95_ms', 'p99_ms', 'max_ms', 'rows', 'bytes'])
+        return pd.DataFrame(rows).sort_values('total_ms', ascending=False, ignore_index=True)
+
+    def histogram(self, method):
+        """Latency bucket counts for one method, labelled by upper bound"""
+        with self.lock:
+            buckets = list(self.methods.get(method, {}).get('buckets', [0] * len(LATENCY_BUCKETS_MS)))
+        labels = [f"≤{bound:g} ms" if bound != float('inf') else f">{LATENCY_BUCKETS_MS[-2]:g} ms"
+                  for bound in LATENCY_BUCKETS_MS]
+        return pd.DataFrame({'latency': labels, 'calls': buckets})
+
+query_stats = QueryStats(slow_query_ms=float(os.environ.get('SLOW_QUERY_MS', 500)))
+
+_statement_timer = contextvars.ContextVar('statement_timer', default=None)
+
+@contextmanager
+def time_statements():
+    """Count statements run in this context, including in run_parallel workers.
+
+    Yields a dict whose 'statements' and 'ms' grow as statements complete;
+    the time is summed across threads, so it can exceed wall time.
+    """
+    timer = {'statements': 0, 'ms': 0.0}
+    token = _statement_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _statement_timer.reset(token)
+
+def truncate_sql(sql):
+    if len(sql) <= SLOW_QUERY_SQL_CHARS:
+        return sql
+    return f"{sql[:SLOW_QUERY_SQL_CHARS]}... ({len(sql) - SLOW_QUERY_SQL_CHARS} more characters)"
+
+def mogrified_prefix(query):
+    """Statement text of an already-mogrified query, cut before its first inlined value"""
+    sql = query.decode('utf-8', errors='replace')
+    values_at = sql.upper().find('VALUES')
+    cut = [position for position in (sql.find("'"), values_at + len('VALUES') if values_at >= 0 else -1)
+           if position >= 0]
+    end = min(cut + [MOGRIFIED_SQL_CHARS])
+    return f"{sql[:end]} ... (values omitted)"
+
+def _bucket_index(elapsed_ms):
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS) - 1
+
+def _histogram_percentile(buckets, quantile, max_ms):
+    """Upper bound of the bucket containing the quantile (capped by the observed max)"""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    threshold = quantile * total
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+        seen += count
+        if seen >= threshold:
+            return min(bound, max_ms)
+    return max_ms
+
+def result_size(result):
+    """Approximate (rows, bytes) for a Database method result"""
+    if result is None:
+        return 0, 0
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(deep=True).sum())
+    if isinstance(result, (bytes, bytearray, memoryview)):
+        return 1, len(result)
+    if isinstance(result, list):
+        return len(result), sum(_value_size(row) for row in result)
+    if isinstance(result, dict):
+        return 1, _value_size(result)
+    return 1, 0
+
+def _value_size(value):
+    if isinstance(value, dict):
+        return sum(_value_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(v) for v in value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if value is None:
+        return 0
+    return len(str(value))
+
+def instrumented(method):
+    """Record latency, rows and bytes of a Database method in query_stats.
+
+    Failures are re-raised as typed errors (see errors.py) when their cause
+    is an unreachable database or a timed-out statement.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            query_stats.record_call(method.__name__, (time.perf_counter() - start) * 1000, failed=True)
+            typed = typed_error(e)
+            if typed is e:
+                raise
+            raise typed from e
+        rows, nbytes = result_size(result)
+        query_stats.record_call(method.__name__, (time.perf_counter() - start) * 1000, rows, nbytes)
+        return result
+    return wrapper
+
+class TimedCursorMixin:
+    """Times execute/copy_expert and logs slow statements with their plan"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        result = super().execute(query, vars)
+        self._record((time.perf_counter() - start) * 1000, query, vars)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        result = super().copy_expert(sql, file, size)
+        self._record((time.perf_counter() - start) * 1000, sql)
+        return result
+
+    def _record(self, elapsed_ms, query, vars=None):
+        if elapsed_ms < query_stats.slow_query_ms:
+            query_stats.record_statement(None, elapsed_ms)
+            return
+        # Only slow statements pay for turning the query into text
+        if isinstance(query, bytes):
+            # Already mogrified (execute_values sends these): the values are
+            # inlined, so keep only the statement before them and skip EXPLAIN
+            sql = mogrified_prefix(query)
+            plan = '(no plan: query sent with its values inlined)'
+        else:
+            # Parameterized SQL: bound values (and image bytes) are never logged
+            sql = query if isinstance(query, str) else query.as_string(self.connection)
+            plan = _explain(self.connection, sql, vars)
+        logger.warning("Slow query (%.1f ms): %s\n%s", elapsed_ms, truncate_sql(sql), plan)
+        query_stats.record_statement(sql, elapsed_ms, plan)
+
+def _explain(conn, sql, vars):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return '(no plan: not a SELECT statement)'
+    # Inside a transaction a failing EXPLAIN would abort the caller's work, so
+    # it runs in a savepoint that is rolled back either way
+    in_transaction = not conn.autocommit
+    try:
+        # Plain base-class cursor so the EXPLAIN itself is not timed or logged
+        with connection.cursor(conn) as cur:
+            if in_transaction:
+                cur.execute("SAVEPOINT explain_slow_query")
+            try:
+                cur.execute(f"EXPLAIN {sql}", vars)
+                return '\n'.join(row[0] for row in cur.fetchall())
+            except Exception as e:
+                return f"(EXPLAIN failed: {str(e)})"
+            finally:
+                if in_transaction:
+                    cur.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                    cur.execute("RELEASE SAVEPOINT explain_slow_query")
+    except Exception as e:
+        return f"(EXPLAIN failed: {str(e)})"
+
+_timed_cursor_classes = {}
+
+def _timed_cursor_class(factory):
+    if issubclass(factory, TimedCursorMixin):
+        return factory
+    if factory not in _timed_cursor_classes:
+        _timed_cursor_classes[factory] = type(f"Timed{factory.__name__}", (TimedCursorMixin, factory), {})
+    return _timed_cursor_classes[factory]
+
+class InstrumentedConnection(connection):
+    """psycopg2 connection whose cursors (any cursor_factory) are timed"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or cursor
+        kwargs['cursor_factory'] = _timed_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
@@ -0,0 +1,185 @@
+"""End-to-end page render load test.
+
+Drives main.py through Streamlit's AppTest, the same script runner the
+server uses, with N concurrent simulated sessions per page. Every session
+starts fresh, so each render pays for its own queries and charts exactly as
+a new browser tab would. For each page it reports render-time percentiles,
+database statements and Database method calls per render, and the peak
+Python memory of one extra traced render. The run fails when a page exceeds
+its budget.
+
+The database is seeded with benchmark.py's synthetic collection unless
+--skip-seed is given. Seeding truncates the collection tables, so only
+point this at a local Postgres (PG* env vars), or pass --skip-seed to
+reuse existing data (including DATABASE_BACKEND=sqlite).
+
+Usage:
+    python load_test.py --scale 1k
+    python load_test.py --scale 100k --sessions 8 --rounds 3
+    python load_test.py --skip-seed --page Statistics --budgets budgets.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+RENDER_TIMEOUT_SECONDS = 120
+SEARCH_TERM = "Royal"
+
+# Per-page limits: p95 render time, database statements per render and
+# peak traced memory of one render. Override any of them with --budgets.
+PAGE_BUDGETS = {
+    'View Collection': {'p95_ms': 5000, 'queries': 10, 'peak_mb': 400},
+    'Market Tracker': {'p95_ms': 5000, 'queries': 10, 'peak_mb': 400},
+    'Statistics': {'p95_ms': 5000, 'queries': 10, 'peak_mb': 400},
+    'Search': {'p95_ms': 3000, 'queries': 10, 'peak_mb': 200},
+    'Shared Collection': {'p95_ms': 2000, 'queries': 10, 'peak_mb': 100},
+}
+
+def page_scenarios(db):
+    """Page name -> scenario dict describing how a fresh session reaches that page"""
+    scenarios = {
+        'View Collection': {'page': 'View Collection'},
+        'Market Tracker': {'page': 'Market Tracker'},
+        'Statistics': {'page': 'Statistics'},
+        'Search': {'page': 'Search', 'search': SEARCH_TERM},
+    }
+    shares = db.get_active_shared_collections()
+    if not shares.empty:
+        scenarios['Shared Collection'] = {'share': shares['share_id'].iloc[0]}
+    return scenarios
+
+def run_session(scenario):
+    """Drive a new AppTest through scenario; returns its timing, query counts and errors"""
+    from instrumentation import query_stats
+
+    at = AppTest.from_file(APP_PATH, default_timeout=RENDER_TIMEOUT_SECONDS)
+    if 'share' in scenario:
+        at.query_params['share'] = scenario['share']
+    else:
+        at.session_state['page'] = scenario['page']
+    statements_before = query_stats.statement_count
+    calls_before = _method_calls(query_stats)
+    start = time.perf_counter()
+    try:
+        at.run()
+        if 'search' in scenario and not at.exception:
+            at.text_input[0].input(scenario['search']).run()
+        errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    except RuntimeError as e:
+        # AppTest raises RuntimeError when a run exceeds RENDER_TIMEOUT_SECONDS
+        errors = [str(e)]
+    return {
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+        'queries': query_stats.statement_count - statements_before,
+        'db_calls': _method_calls(query_stats) - calls_before,
+        'errors': errors
+    }
+
+def _start_worker():
+    """Import the app and connect before any session is timed"""
+    import main  # noqa: F401
+
+def run_page(scenario, executor, sessions, rounds):
+    """Render a page sessions x rounds times, then once more here under tracemalloc"""
+    renders = []
+    for _ in range(rounds):
+        renders.extend(executor.map(run_session, [scenario] * sessions))
+
+    run_session(scenario)  # warm-up for the traced render
+    tracemalloc.start()
+    run_session(scenario)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [render['elapsed_ms'] for render in renders]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'renders': len(renders), 'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1), 'p99_ms': round(p99, 1),
+            'queries': round(float(np.mean([render['queries'] for render in renders])), 1),
+            'db_calls': round(float(np.mean([render['db_calls'] for render in renders])), 1),
+            'peak_mb': round(peak / (1024 * 1024), 1),
+            'errors': sorted({error for render in renders for error in render['errors']})}
+
+def check_budgets(results, budgets):
+    """Return a list of human-readable budget violations and page errors"""
+    violations = []
+    for page, result in results.items():
+        for error in result['errors']:
+            violations.append(f"{page}: {error}")
+        for metric, limit in budgets.get(page, {}).items():
+            if result[metric] > limit:
+                violations.append(f"{page}: {metric} {result[metric]:g} exceeds budget {limit:g}")
+    return violations
+
+def load_budgets(path):
+    budgets = {page: dict(limits) for page, limits in PAGE_BUDGETS.items()}
+    if path:
+        with open(path) as f:
+            for page, limits in json.load(f).items():
+                budgets.setdefault(page, {}).update(limits)
+    return budgets
+
+def _method_calls(query_stats):
+    with query_stats.lock:
+        return sum(stats['calls'] for stats in query_stats.methods.values())
+
+def main():
+    from benchmark import SCALES, seed_database
+
+    parser = argparse.ArgumentParser(description="Load test Streamlit page renders against a synthetic collection")
+    parser.add_argument('--scale', choices=SCALES.keys(), default='1k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true', help="Reuse the data already in the database")
+    parser.add_argument('--sessions', type=int, default=4, help="Concurrent sessions per page")
+    parser.add_argument('--rounds', type=int, default=3, help="Times each batch of sessions is repeated")
+    parser.add_argument('--page', action='append', dest='pages', help="Only test this page (repeatable)")
+    parser.add_argument('--budgets', help="JSON file of per-page budgets overriding the defaults")
+    parser.add_argument('--output', help="Also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    from database import db
+
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed_database(db, SCALES[args.scale], args.seed)
+        print(f"Seeded {SCALES[args.scale]:,} decks in {time.perf_counter() - start:.1f}s")
+
+    scenarios = page_scenarios(db)
+    if args.pages:
+        scenarios = {page: scenario for page, scenario in scenarios.items() if page in args.pages}
+
+    results = {}
+    print(f"{'page':<20}{'renders':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'queries':>9}{'db calls':>10}{'peak MB':>9}")
+    # Streamlit keeps one runtime per process, so each concurrent session gets its own process
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_start_worker) as executor:
+        for page, scenario in scenarios.items():
+            results[page] = r = run_page(scenario, executor, args.sessions, args.rounds)
+            print(f"{page:<20}{r['renders']:>9}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                  f"{r['queries']:>9.1f}{r['db_calls']:>10.1f}{r['peak_mb']:>9.1f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    violations = check_budgets(results, load_budgets(args.budgets))
+    if violations:
+        print("Budget violations:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("All pages within budget")
+
+if __name__ == "__main__":
+    # Run as the importable module so worker processes can unpickle run_session;
+    # AppTest swaps out __main__ while it executes the app script.
+    import load_test
+    load_test.main()
@@ -6,6 +6,8 @@ from components.search import render_search
 from components.wishlist import render_wishlist
 from components.market_tracker import render_market_tracker
 from components.share_collection import render_share_collection, render_shared_collection
+from components.query_stats import render_query_stats
+from profiling import profiling_enabled, profile_page, render_profile_summary
 
 st.set_page_config(
     page_title="Playing Card Collection Manager",
@@ -18,8 +20,12 @@ def main():
     
     # Check if viewing a shared collection
     query_params = st.query_params
+    profiling = profiling_enabled(query_params)
     if 'share' in query_params:
-        render_shared_collection(query_params['share'][0])
+        if profiling:
+            render_profile_summary(profile_page("Shared Collection", render_shared_collection, query_params['share']))
+        else:
+            render_shared_collection(query_params['share'])
         return
     
     # Navigation
@@ -30,15 +36,19 @@ def main():
         "Wishlist": render_wishlist,
         "Share Collection": render_share_collection,
         "Statistics": render_statistics,
-        "Search": render_search
+        "Search": render_search,
+        "Query Stats": render_query_stats
     }
     
     # Sidebar navigation
     st.sidebar.title("Navigation")
-    selection = st.sidebar.radio("Go to", list(pages.keys()))
+    selection = st.sidebar.radio("Go to", list(pages.keys()), key="page")
     
     # Render selected page
-    pages[selection]()
+    if profiling:
+        render_profile_summary(profile_page(selection, pages[selection]))
+    else:
+        pages[selection]()
     
     # Footer
     st.sidebar.markdown("---")
@@ -0,0 +1,91 @@
+"""Scheduled database maintenance.
+
+Each task is a named step run against the shared Database object:
+
+* ``expired_shares`` deletes expired shares (and their memberships) in batches;
+* ``failed_migrations`` clears failed migration rows so they can be retried;
+* ``dismissed_alerts`` drops price alerts dismissed long ago;
+* ``price_alerts`` catches up on alert matching for recent price changes;
+* ``valuation_snapshot`` records today's collection and per-manufacturer value;
+* ``image_hashes`` backfills perceptual hashes for images stored without one;
+* ``materialized_views`` refreshes every materialized view;
+* ``vacuum_analyze`` vacuums and analyzes the tables with the most churn.
+
+Every run logs what each task did and how long it took; a failing task is
+logged and the remaining tasks still run.
+
+Usage:
+    python maintenance.py                 # run all tasks once
+    python maintenance.py --loop          # repeat every MAINTENANCE_INTERVAL_SECONDS
+    python maintenance.py --task expired_shares --task vacuum_analyze
+"""
+import argparse
+import logging
+import os
+import time
+from image_index import backfill_image_hashes
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL_SECONDS = int(os.environ.get('MAINTENANCE_INTERVAL_SECONDS', 3600))
+SHARE_PURGE_BATCH_SIZE = 1000
+ALERT_RETENTION_DAYS = int(os.environ.get('ALERT_RETENTION_DAYS', 30))
+
+TASKS = [
+    ('expired_shares', lambda db: db.purge_expired_shares(batch_size=SHARE_PURGE_BATCH_SIZE)),
+    ('failed_migrations', lambda db: db.purge_failed_migrations()),
+    ('dismissed_alerts', lambda db: db.purge_dismissed_alerts(retention_days=ALERT_RETENTION_DAYS)),
+    ('price_alerts', lambda db: db.match_price_alerts()),
+    ('valuation_snapshot', lambda db: db.snapshot_valuations()),
+    ('image_hashes', lambda db: backfill_image_hashes(db, workers=1)),
+    ('materialized_views', lambda db: db.refresh_materialized_views()),
+    ('vacuum_analyze', lambda db: db.vacuum_analyze()),
+]
+TASK_NAMES = [name for name, _ in TASKS]
+
+def run_maintenance(db, task_names=None):
+    """Run the selected tasks (all by default) in order; returns one result dict per task"""
+    results = []
+    for name, task in TASKS:
+        if task_names and name not in task_names:
+            continue
+        start = time.perf_counter()
+        try:
+            outcome = task(db)
+            error = None
+        except Exception as e:
+            outcome = None
+            error = str(e)
+        elapsed = time.perf_counter() - start
+        if error is None:
+            logger.info("%s: %s (%.2fs)", name, outcome, elapsed)
+        else:
+            logger.error("%s failed after %.2fs: %s", name, elapsed, error)
+        results.append({'task': name, 'result': outcome, 'error': error, 'seconds': round(elapsed, 3)})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge expired data and keep tables healthy")
+    parser.add_argument('--task', action='append', choices=TASK_NAMES, dest='tasks',
+                        help="Run only this task (repeatable)")
+    parser.add_argument('--loop', action='store_true', help="Keep running on a schedule")
+    parser.add_argument('--interval', type=int, default=MAINTENANCE_INTERVAL_SECONDS,
+                        help="Seconds between runs with --loop")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from database import db
+
+    while True:
+        start = time.perf_counter()
+        results = run_maintenance(db, args.tasks)
+        failed = sum(result['error'] is not None for result in results)
+        logger.info("Maintenance run finished in %.1fs (%d tasks, %d failed)",
+                    time.perf_counter() - start, len(results), failed)
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Opt-in per-page render profiling.
+
+Enabled by setting PROFILE_PAGES=1. Opening the app with ?profile=1 also
+enables it, but only when ALLOW_PROFILE_PARAM=1, so visitors cannot turn on
+profiling in production. Each page render is run under cProfile and its self
+time is split into DataFrame (pandas/NumPy/Arrow), Charts (Plotly figure
+building and serialization), Streamlit and Other. Database is the time of
+the render's SQL statements as recorded by instrumentation, summed over
+run_parallel worker threads that cProfile does not see.
+
+Set PROFILE_DIR to also save a profile per rerun: cProfile ``.prof`` files
+by default, or pyinstrument HTML reports with PROFILER=pyinstrument (when
+pyinstrument is installed; the category breakdown is unavailable then).
+"""
+import cProfile
+import os
+import pstats
+import time
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from instrumentation import time_statements
+
+CATEGORIES = ['Database', 'DataFrame', 'Charts', 'Streamlit', 'Other']
+TOP_FUNCTIONS = 15
+
+def profiling_enabled(query_params):
+    if os.environ.get('PROFILE_PAGES') == '1':
+        return True
+    return os.environ.get('ALLOW_PROFILE_PARAM') == '1' and query_params.get('profile') == '1'
+
+def profile_page(page_name, render, *args):
+    """Run render(*args) under a profiler and return its timing breakdown"""
+    use_pyinstrument = os.environ.get('PROFILER') == 'pyinstrument'
+    profiler = _start_profiler(use_pyinstrument)
+    start = time.perf_counter()
+    try:
+        with time_statements() as statements:
+            render(*args)
+    finally:
+        wall_ms = (time.perf_counter() - start) * 1000
+        if profiler is not None and use_pyinstrument:
+            profiler.stop()
+        elif profiler is not None:
+            profiler.disable()
+
+    profile = {
+        'page': page_name,
+        'wall_ms': wall_ms,
+        'statements': statements['statements'],
+        'db_ms': statements['ms'],
+        'breakdown': None,
+        'top_functions': None,
+        'saved_to': None
+    }
+    if profiler is None:
+        return profile
+
+    if use_pyinstrument:
+        profile['saved_to'] = _save_profile(page_name, 'html', lambda path: _write_text(path, profiler.output_html()))
+        return profile
+
+    stats = pstats.Stats(profiler)
+    profile['breakdown'], profile['top_functions'] = _summarize(stats, statements['ms'])
+    profile['saved_to'] = _save_profile(page_name, 'prof', stats.dump_stats)
+    return profile
+
+def render_profile_summary(profile):
+    """Show a profile from profile_page in the sidebar"""
+    with st.sidebar.expander(f"⏱️ {profile['page']}: {profile['wall_ms']:.0f} ms", expanded=True):
+        st.caption(f"{profile['statements']} SQL statements, {profile['db_ms']:.0f} ms")
+        if profile['breakdown'] is None:
+            st.write("Category breakdown unavailable for this run.")
+        else:
+            st.bar_chart(profile['breakdown'].set_index('category')['ms'], horizontal=True)
+            st.dataframe(profile['top_functions'], hide_index=True)
+        if profile['saved_to']:
+            st.caption(f"Saved to {profile['saved_to']}")
+
+def _start_profiler(use_pyinstrument):
+    try:
+        if use_pyinstrument:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except (ImportError, ValueError, RuntimeError):
+        # pyinstrument missing or another profiler already active on this thread
+        return None
+
+def _summarize(stats, db_ms):
+    totals = dict.fromkeys(CATEGORIES, 0.0)
+    functions = []
+    for (filename, line, funcname), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        category = _categorize(filename, funcname)
+        if category != 'Database':
+            totals[category] += self_time * 1000
+        functions.append({
+            'function': funcname if filename == '~' else f"{os.path.basename(filename)}:{line}({funcname})",
+            'category': category,
+            'calls': calls,
+            'self_ms': self_time * 1000,
+            'cumulative_ms': cumulative * 1000
+        })
+    # cProfile only sees the render thread, so the statement timer replaces its Database share
+    totals['Database'] = db_ms
+    breakdown = pd.DataFrame({'category': CATEGORIES, 'ms': [totals[c] for c in CATEGORIES]})
+    top_functions = pd.DataFrame(functions).nlargest(TOP_FUNCTIONS, 'self_ms') if functions else pd.DataFrame()
+    return breakdown, top_functions
+
+def _categorize(filename, funcname):
+    path = filename.replace('\\', '/')
+    if 'psycopg2' in path or 'psycopg2' in funcname or path.endswith(('/database.py', '/instrumentation.py')):
+        return 'Database'
+    if any(lib in path for lib in ('/pandas/', '/numpy/', '/pyarrow/')) or \
+            any(lib in funcname for lib in ('pandas', 'numpy', 'pyarrow')):
+        return 'DataFrame'
+    if '/plotly/' in path or '/_plotly_utils/' in path:
+        return 'Charts'
+    if '/streamlit/' in path:
+        return 'Streamlit'
+    return 'Other'
+
+def _save_profile(page_name, extension, write):
+    profile_dir = os.environ.get('PROFILE_DIR')
+    if not profile_dir:
+        return None
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = page_name.lower().replace(' ', '_')
+    path = os.path.join(profile_dir, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{slug}.{extension}")
+    write(path)
+    return path
+
+def _write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
@@ -0,0 +1,1078 @@
+"""Embedded SQLite storage backend.
+
+SQLiteDatabase implements the same method surface as database.Database so
+every page runs unchanged on a local file, with no Postgres server needed.
+database.create_database refuses to start if the public methods of the two
+classes drift apart.
+Select it with DATABASE_BACKEND=sqlite (file path in SQLITE_PATH).
+
+Postgres features are replaced as follows:
+
+* ``= ANY(%s)`` over an id list becomes ``IN (SELECT value FROM json_each(?))``
+  with the list passed as JSON text.
+* ``uuid_generate_v4()`` is a column default expression building a random
+  version 4 UUID from ``randomblob``.
+* ``normalize_name()`` is ``dedupe.normalize_name`` registered as a deterministic
+  function, the same normalization the import duplicate check uses.
+* COPY bulk loads become ``executemany`` inside one transaction.
+
+The database runs in WAL mode. A single connection is shared by all
+Streamlit sessions and serialized with a lock.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from dedupe import normalize_name
+from image_index import add_to_image_index
+from instrumentation import instrumented, query_stats
+from utils import (compute_image_hash, compact_frame, DECK_FRAME_SCHEMA, WISHLIST_FRAME_SCHEMA,
+                   MARKET_VALUE_FRAME_SCHEMA, VALUATION_FRAME_SCHEMA)
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(pd.Timestamp, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_converter('DATE', lambda raw: date.fromisoformat(raw.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('INTARRAY', lambda raw: json.loads(raw))
+sqlite3.register_converter('BOOLEAN', lambda raw: raw not in (b'0', b''))
+
+NOW = "datetime('now', 'localtime')"
+UUID_V4 = (
+    "(lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', abs(random()) % 4 + 1, 1) || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6))))"
+)
+ALERT_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Same query classes as the Postgres backend; 0 disables a timeout
+INTERACTIVE_TIMEOUT_MS = int(os.environ.get('SQLITE_INTERACTIVE_TIMEOUT_MS', 15000))
+BULK_TIMEOUT_MS = int(os.environ.get('SQLITE_BULK_TIMEOUT_MS', 600000))
+BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+MIGRATIONS = [
+    {
+        'version': 1,
+        'name': 'initial_schema',
+        'up': f"""
+            CREATE TABLE IF NOT EXISTS decks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                deck_name VARCHAR(255) NOT NULL,
+                manufacturer VARCHAR(255) NOT NULL,
+                release_year INTEGER,
+                condition VARCHAR(50),
+                purchase_date DATE,
+                purchase_price REAL,
+                notes TEXT,
+                image_data BLOB,
+                created_at TIMESTAMP DEFAULT ({NOW})
+            );
+        """,
+        'down': "DROP TABLE IF EXISTS decks;"
+    },
+    {
+        'version': 2,
+        'name': 'add_wishlist',
+        'up': f"""
+            CREATE TABLE IF NOT EXISTS wishlist (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                deck_name VARCHAR(255) NOT NULL,
+                manufacturer VARCHAR(255) NOT NULL,
+                expected_price REAL,
+                priority INTEGER CHECK (priority BETWEEN 1 AND 5),
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT ({NOW})
+            );
+        """,
+        'down': "DROP TABLE IF EXISTS wishlist;"
+    },
+    {
+        'version': 3,
+        'name': 'add_market_values',
+        'up': f"""
+            CREATE TABLE IF NOT EXISTS market_values (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                deck_id INTEGER REFERENCES decks(id),
+                market_price REAL NOT NULL,
+                source VARCHAR(255),
+                condition VARCHAR(50),
+                updated_at TIMESTAMP DEFAULT ({NOW}),
+                notes TEXT,
+                UNIQUE(deck_id, source)
+            );
+        """,
+        'down': "DROP TABLE IF EXISTS market_values;"
+    },
+    {
+        'version': 4,
+        'name': 'add_uuid_extension',
+        'up': "",  # UUIDs come from the UUID_V4 default expression
+        'down': ""
+    },
+    {
+        'version': 5,
+        'name': 'add_shared_collections',
+        'up': f"""
+            CREATE TABLE IF NOT EXISTS shared_collections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                share_id TEXT DEFAULT {UUID_V4},
+                name VARCHAR(255) NOT NULL,
+                description TEXT,
+                deck_ids INTARRAY NOT NULL,
+                created_at TIMESTAMP DEFAULT ({NOW}),
+                expires_at TIMESTAMP,
+                is_public BOOLEAN DEFAULT 0,
+                UNIQUE(share_id)
+            );
+        """,
+        'down': "DROP TABLE IF EXISTS shared_collections;"
+    },
+    {
+        'version': 6,
+        'name': 'add_price_alerts',
+        'up': f"""
+            CREATE INDEX IF NOT EXISTS market_values_updated_at_idx ON market_values (updated_at);
+
+            CREATE TABLE IF NOT EXISTS price_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                wishlist_id INTEGER NOT NULL REFERENCES wishlist(id) ON DELETE CASCADE,
+                market_value_id INTEGER NOT NULL REFERENCES market_values(id) ON DELETE CASCADE,
+                market_price REAL NOT NULL,
+                expected_price REAL NOT NULL,
+                dismissed BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT ({NOW}),
+                UNIQUE(wishlist_id, market_value_id)
+            );
+
+            CREATE TABLE IF NOT EXISTS job_watermarks (
+                job VARCHAR(100) PRIMARY KEY,
+                watermark TIMESTAMP NOT NULL
+            );
+        """,
+        'down': """
+            DROP TABLE IF EXISTS job_watermarks;
+            DROP TABLE IF EXISTS price_alerts;
+            DROP INDEX IF EXISTS market_values_updated_at_idx;
+        """
+    },
+    {
+        'version': 7,
+        'name': 'add_wishlist_page_index',
+        'up': "CREATE INDEX IF NOT EXISTS wishlist_priority_created_idx ON wishlist (priority DESC, created_at DESC);",
+        'down': "DROP INDEX IF EXISTS wishlist_priority_created_idx;"
+    },
+    {
+        'version': 8,
+        'name': 'add_image_phash',
+        'up': """
+            ALTER TABLE decks ADD COLUMN image_phash INTEGER;
+            CREATE INDEX IF NOT EXISTS decks_missing_phash_idx ON decks (id)
+                WHERE image_phash IS NULL AND image_data IS NOT NULL;
+        """,
+        'down': """
+            DROP INDEX IF EXISTS decks_missing_phash_idx;
+            ALTER TABLE decks DROP COLUMN image_phash;
+        """
+    },
+    {
+        'version': 9,
+        'name': 'add_shared_collection_decks',
+        'up': """
+            CREATE TABLE IF NOT EXISTS shared_collection_decks (
+                collection_id INTEGER NOT NULL REFERENCES shared_collections(id) ON DELETE CASCADE,
+                deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (collection_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS shared_collection_decks_deck_idx
+                ON shared_collection_decks (deck_id, collection_id);
+            INSERT INTO shared_collection_decks (collection_id, deck_id, position)
+                SELECT sc.id, t.value, t.key + 1
+                FROM shared_collections sc, json_each(sc.deck_ids) t
+                WHERE EXISTS (SELECT 1 FROM decks d WHERE d.id = t.value);
+            ALTER TABLE shared_collections DROP COLUMN deck_ids;
+        """,
+        'down': """
+            ALTER TABLE shared_collections ADD COLUMN deck_ids INTARRAY NOT NULL DEFAULT '[]';
+            UPDATE shared_collections SET deck_ids = (
+                SELECT json_group_array(deck_id) FROM (
+                    SELECT deck_id FROM shared_collection_decks
+                    WHERE collection_id = shared_collections.id
+                    ORDER BY position
+                )
+            );
+            DROP TABLE IF EXISTS shared_collection_decks;
+        """
+    },
+    {
+        'version': 10,
+        'name': 'add_maintenance_indexes',
+        'up': """
+            CREATE INDEX IF NOT EXISTS shared_collections_expires_at_idx
+                ON shared_collections (expires_at) WHERE expires_at IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS price_alerts_dismissed_created_idx
+                ON price_alerts (created_at) WHERE dismissed;
+        """,
+        'down': """
+            DROP INDEX IF EXISTS price_alerts_dismissed_created_idx;
+            DROP INDEX IF EXISTS shared_collections_expires_at_idx;
+        """
+    },
+    {
+        'version': 11,
+        'name': 'add_valuation_snapshots',
+        'up': """
+            CREATE TABLE IF NOT EXISTS valuation_snapshots (
+                scope VARCHAR(20) NOT NULL CHECK (scope IN ('collection', 'manufacturer')),
+                scope_key VARCHAR(255) NOT NULL DEFAULT '',
+                snapshot_date DATE NOT NULL,
+                deck_count INTEGER NOT NULL,
+                valued_decks INTEGER NOT NULL,
+                cost_basis REAL NOT NULL,
+                market_value REAL NOT NULL,
+                PRIMARY KEY (scope, scope_key, snapshot_date)
+            ) WITHOUT ROWID;
+        """,
+        'down': "DROP TABLE IF EXISTS valuation_snapshots;"
+    },
+    {
+        # Version 12 (the normalize_name SQL function) only exists on Postgres
+        'version': 13,
+        'name': 'add_image_hash_failed',
+        'up': """
+            ALTER TABLE decks ADD COLUMN image_hash_failed BOOLEAN NOT NULL DEFAULT 0;
+            DROP INDEX IF EXISTS decks_missing_phash_idx;
+            CREATE INDEX decks_missing_phash_idx ON decks (id)
+                WHERE image_phash IS NULL AND image_data IS NOT NULL AND NOT image_hash_failed;
+        """,
+        'down': """
+            DROP INDEX IF EXISTS decks_missing_phash_idx;
+            CREATE INDEX decks_missing_phash_idx ON decks (id)
+                WHERE image_phash IS NULL AND image_data IS NOT NULL;
+            ALTER TABLE decks DROP COLUMN image_hash_failed;
+        """
+    }
+]
+
+DECK_FILTER_COLUMNS = ['deck_name', 'manufacturer', 'release_year', 'condition']
+DECK_EDITABLE_COLUMNS = ['deck_name', 'manufacturer', 'release_year', 'condition',
+                         'purchase_date', 'purchase_price', 'notes']
+IN_IDS = "IN (SELECT value FROM json_each(?))"
+ACTIVE_SHARES_SQL = f"""
+    SELECT sc.*,
+           (SELECT COUNT(*) FROM shared_collection_decks scd WHERE scd.collection_id = sc.id) AS deck_count
+    FROM shared_collections sc
+    WHERE sc.expires_at IS NULL OR sc.expires_at > {NOW}
+    ORDER BY sc.created_at DESC
+"""
+
+def _json_ids(ids):
+    return json.dumps([int(i) for i in ids])
+
+class TimedSQLiteCursor(sqlite3.Cursor):
+    """Feeds statement timings and slow-query plans into query_stats"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._record(sql, parameters, (time.perf_counter() - start) * 1000)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._record(sql, None, (time.perf_counter() - start) * 1000)
+        return result
+
+    def _record(self, sql, parameters, elapsed_ms):
+        plan = None
+        if elapsed_ms >= query_stats.slow_query_ms and parameters is not None \
+                and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            with closing(sqlite3.Cursor(self.connection)) as cur:
+                rows = cur.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            plan = '\n'.join(str(row[-1]) for row in rows)
+        query_stats.record_statement(sql, elapsed_ms, plan)
+
+class InstrumentedSQLiteConnection(sqlite3.Connection):
+    """Timed cursors, plus a deadline that interrupts the running statement once passed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline = None
+        self.set_progress_handler(self._past_deadline, 10000)
+
+    def _past_deadline(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def cursor(self, factory=TimedSQLiteCursor):
+        return super().cursor(factory)
+
+class SQLiteDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.image_hash_version = 0  # bumped on bulk hash changes and deletes in this process
+        self.replicas = []
+        self.conn = self.new_connection()
+        self.init_migrations()
+
+    def new_connection(self, timeout_ms=BULK_TIMEOUT_MS):
+        """Open an additional connection to the database file.
+
+        timeout_ms mirrors Database.new_connection, but SQLite has no session
+        statement timeout: only statements run under _statement_timeout on
+        the shared connection are interrupted.
+        """
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            factory=InstrumentedSQLiteConnection
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function('normalize_name', 1, normalize_name, deterministic=True)
+        return conn
+
+    def init_migrations(self):
+        """Create the schema_migrations table and apply pending migrations"""
+        with self.lock, closing(self.conn.cursor()) as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT ({NOW}),
+                    status VARCHAR(50) DEFAULT 'pending',
+                    rollback_sql TEXT
+                )
+            """)
+            self.conn.commit()
+            current_version = self.get_current_schema_version()
+            for migration in MIGRATIONS:
+                if migration['version'] <= current_version:
+                    continue
+                try:
+                    cur.execute("BEGIN")
+                    for statement in _split_statements(migration['up']):
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT OR REPLACE INTO schema_migrations (version, name, status, rollback_sql, applied_at) "
+                        "VALUES (?, ?, 'completed', ?, ?)",
+                        (migration['version'], migration['name'], migration['down'], datetime.now())
+                    )
+                    self.conn.commit()
+                except Exception as e:
+                    self.conn.rollback()
+                    raise Exception(f"Migration {migration['version']} failed: {str(e)}")
+
+    def rollback_migration(self, version):
+        """Rollback a specific migration version"""
+        with self.lock, closing(self.conn.cursor()) as cur:
+            try:
+                cur.execute("SELECT rollback_sql FROM schema_migrations WHERE version = ?", (version,))
+                result = cur.fetchone()
+                if not result:
+                    raise Exception(f"Migration version {version} not found")
+                cur.execute("BEGIN")
+                for statement in _split_statements(result[0]):
+                    cur.execute(statement)
+                cur.execute("DELETE FROM schema_migrations WHERE version = ?", (version,))
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"Rollback failed for version {version}: {str(e)}")
+
+    def get_current_schema_version(self):
+        """Get the current schema version"""
+        with self.lock, closing(self.conn.cursor()) as cur:
+            cur.execute("SELECT MAX(version) FROM schema_migrations WHERE status = 'completed'")
+            return cur.fetchone()[0] or 0
+
+    def ensure_connection(self):
+        pass
+
+    def replica_status(self):
+        return []
+
+    def read(self, query):
+        """Run query(conn); there are no replicas, so always on the local file"""
+        with self.lock, self._statement_timeout(INTERACTIVE_TIMEOUT_MS):
+            return query(self.conn)
+
+    @contextmanager
+    def _statement_timeout(self, timeout_ms):
+        self.conn.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+        try:
+            yield
+        finally:
+            self.conn.deadline = None
+
+    def run_parallel(self, *calls):
+        """Same contract as Database.run_parallel; the single file connection runs them in turn"""
+        return [call() for call in calls]
+
+    def _read_frame(self, query, params=()):
+        return self.read(lambda conn: pd.read_sql(query, conn, params=params))
+
+    def _fetch_dicts(self, query, params=()):
+        with self.lock, self._statement_timeout(INTERACTIVE_TIMEOUT_MS), closing(self.conn.cursor()) as cur:
+            cur.execute(query, params)
+            columns = [column[0] for column in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def _write(self, error_message, operation, bulk=False):
+        """Run operation(cur) in a transaction, returning its result"""
+        timeout_ms = BULK_TIMEOUT_MS if bulk else INTERACTIVE_TIMEOUT_MS
+        with self.lock, self._statement_timeout(timeout_ms), closing(self.conn.cursor()) as cur:
+            try:
+                result = operation(cur)
+                self.conn.commit()
+                return result
+            except Exception as e:
+                self.conn.rollback()
+                raise Exception(f"{error_message}: {str(e)}")
+
+    @instrumented
+    def add_deck(self, deck_data, image_data=None):
+        image_phash = compute_image_hash(image_data) if image_data else None
+
+        def insert(cur):
+            cur.execute("""
+                INSERT INTO decks (deck_name, manufacturer, release_year, condition,
+                                   purchase_date, purchase_price, notes, image_data, image_phash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                deck_data['deck_name'], deck_data['manufacturer'],
+                deck_data['release_year'], deck_data['condition'],
+                deck_data['purchase_date'], deck_data['purchase_price'],
+                deck_data['notes'], image_data, image_phash
+            ))
+            return cur.lastrowid
+
+        deck_id = self._write("Database error", insert)
+        if image_phash is not None:
+            add_to_image_index(deck_id, image_phash)
+        return deck_id
+
+    @instrumented
+    def bulk_add_decks(self, decks, chunk_size=100000):
+        """Bulk-load validated deck rows (a DataFrame) in a single transaction"""
+        columns = ['deck_name', 'manufacturer', 'release_year', 'condition',
+                   'purchase_date', 'purchase_price', 'notes']
+        rows = decks[columns].assign(
+            purchase_date=pd.to_datetime(decks['purchase_date']).dt.date,
+            notes=decks['notes'].fillna('')
+        )
+
+        def insert(cur):
+            for start in range(0, len(rows), chunk_size):
+                cur.executemany(
+                    f"INSERT INTO decks ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    rows.iloc[start:start + chunk_size].itertuples(index=False, name=None)
+                )
+            return len(rows)
+
+        return self._write("Bulk import failed", insert, bulk=True)
+
+    def _deck_selection(self, deck_ids=None, filters=None):
+        """WHERE clause and params selecting decks by id list and/or column filters"""
+        clauses = []
+        params = []
+        if deck_ids is not None:
+            clauses.append(f"id {IN_IDS}")
+            params.append(_json_ids(deck_ids))
+        for column, value in (filters or {}).items():
+            if column not in DECK_FILTER_COLUMNS:
+                raise Exception(f"Cannot filter decks by {column}")
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps([v.item() if isinstance(v, np.generic) else v for v in value]))
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if not clauses:
+            raise Exception("Bulk deck operations need deck ids or filters")
+        return " AND ".join(clauses), params
+
+    @instrumented
+    def update_decks(self, changes, deck_ids=None, filters=None):
+        """Set the same column values on every selected deck in one UPDATE"""
+        unknown = [column for column in changes if column not in DECK_EDITABLE_COLUMNS]
+        if unknown or not changes:
+            raise Exception(f"Invalid deck changes: {', '.join(unknown) or 'nothing to update'}")
+        where, params = self._deck_selection(deck_ids, filters)
+        assignments = ', '.join(f"{column} = ?" for column in changes)
+
+        def update(cur):
+            cur.execute(f"UPDATE decks SET {assignments} WHERE {where}", list(changes.values()) + params)
+            return cur.rowcount
+
+        return self._write("Failed to update decks", update, bulk=True)
+
+    @instrumented
+    def delete_decks(self, deck_ids=None, filters=None):
+        """Delete the selected decks and their market values in one transaction.
+
+        Share memberships and price alerts go with them (ON DELETE CASCADE).
+        """
+        where, params = self._deck_selection(deck_ids, filters)
+
+        def delete(cur):
+            cur.execute(f"SELECT id FROM decks WHERE {where}", params)
+            ids = [row[0] for row in cur.fetchall()]
+            if not ids:
+                return 0
+            cur.execute(f"DELETE FROM market_values WHERE deck_id {IN_IDS}", (_json_ids(ids),))
+            cur.execute(f"DELETE FROM decks WHERE id {IN_IDS}", (_json_ids(ids),))
+            return cur.rowcount
+
+        deleted = self._write("Failed to delete decks", delete, bulk=True)
+        self.image_hash_version += 1
+        return deleted
+
+    @instrumented
+    def update_market_value(self, deck_id, market_data):
+        def upsert(cur):
+            cur.execute(f"""
+                INSERT INTO market_values (deck_id, market_price, source, condition, notes)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (deck_id, source)
+                DO UPDATE SET
+                    market_price = excluded.market_price,
+                    condition = excluded.condition,
+                    notes = excluded.notes,
+                    updated_at = {NOW}
+            """, (
+                deck_id,
+                market_data['market_price'],
+                market_data['source'],
+                market_data['condition'],
+                market_data.get('notes', '')
+            ))
+            cur.execute("SELECT id FROM market_values WHERE deck_id = ? AND source = ?",
+                        (deck_id, market_data['source']))
+            return cur.fetchone()[0]
+
+        return self._write("Failed to update market value", upsert)
+
+    @instrumented
+    def get_market_values(self, deck_id=None):
+        try:
+            query = """
+                SELECT mv.*, d.deck_name, d.manufacturer, d.condition as deck_condition, d.purchase_price
+                FROM market_values mv
+                JOIN decks d ON mv.deck_id = d.id
+            """
+            params = []
+            if deck_id:
+                query += " WHERE mv.deck_id = ?"
+                params.append(deck_id)
+            query += " ORDER BY mv.updated_at DESC"
+            return compact_frame(self._read_frame(query, params), MARKET_VALUE_FRAME_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to fetch market values: {str(e)}")
+
+    @instrumented
+    def snapshot_valuations(self, snapshot_date=None):
+        """Record the collection's and each manufacturer's value for snapshot_date (today by default).
+
+        Each deck is valued at its most recent market price, or at its
+        purchase price if it has none. Re-running on the same day overwrites
+        that day's rows. Returns the number of rows written.
+        """
+        snapshot_date = snapshot_date or date.today()
+
+        def snapshot(cur):
+            cur.execute("""
+                WITH latest AS (
+                    SELECT deck_id, market_price FROM (
+                        SELECT deck_id, market_price,
+                               ROW_NUMBER() OVER (PARTITION BY deck_id ORDER BY updated_at DESC) AS rn
+                        FROM market_values
+                    ) WHERE rn = 1
+                ),
+                valued AS (
+                    SELECT d.manufacturer, d.purchase_price, l.market_price
+                    FROM decks d
+                    LEFT JOIN latest l ON l.deck_id = d.id
+                )
+                INSERT INTO valuation_snapshots
+                    (scope, scope_key, snapshot_date, deck_count, valued_decks, cost_basis, market_value)
+                SELECT 'collection', '', :date, COUNT(*), COUNT(market_price),
+                       COALESCE(SUM(purchase_price), 0), COALESCE(SUM(COALESCE(market_price, purchase_price)), 0)
+                FROM valued
+                UNION ALL
+                SELECT 'manufacturer', manufacturer, :date, COUNT(*), COUNT(market_price),
+                       COALESCE(SUM(purchase_price), 0), COALESCE(SUM(COALESCE(market_price, purchase_price)), 0)
+                FROM valued
+                GROUP BY manufacturer
+                ON CONFLICT (scope, scope_key, snapshot_date) DO UPDATE SET
+                    deck_count = excluded.deck_count,
+                    valued_decks = excluded.valued_decks,
+                    cost_basis = excluded.cost_basis,
+                    market_value = excluded.market_value
+            """, {'date': snapshot_date})
+            # rowcount is -1 for an INSERT ... SELECT with a CTE
+            return cur.execute("SELECT changes()").fetchone()[0]
+
+        return self._write("Failed to snapshot valuations", snapshot, bulk=True)
+
+    @instrumented
+    def get_valuation_history(self, manufacturer=None, start_date=None, end_date=None):
+        """Daily valuations of the whole collection, or of one manufacturer, oldest first"""
+        try:
+            query = """
+                SELECT snapshot_date, deck_count, valued_decks, cost_basis, market_value
+                FROM valuation_snapshots
+                WHERE scope = ? AND scope_key = ?
+            """
+            params = ['manufacturer', manufacturer] if manufacturer else ['collection', '']
+            if start_date:
+                query += " AND snapshot_date >= ?"
+                params.append(start_date)
+            if end_date:
+                query += " AND snapshot_date <= ?"
+                params.append(end_date)
+            query += " ORDER BY snapshot_date"
+            return compact_frame(self._read_frame(query, params), VALUATION_FRAME_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to fetch valuation history: {str(e)}")
+
+    @instrumented
+    def add_to_wishlist(self, wishlist_data):
+        def insert(cur):
+            cur.execute("""
+                INSERT INTO wishlist (deck_name, manufacturer, expected_price, priority, notes)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                wishlist_data['deck_name'], wishlist_data['manufacturer'],
+                wishlist_data['expected_price'], wishlist_data['priority'],
+                wishlist_data['notes']
+            ))
+            return cur.lastrowid
+
+        return self._write("Database error", insert)
+
+    @instrumented
+    def remove_from_wishlist(self, wishlist_ids):
+        """Delete one wishlist item or a list of them in a single statement"""
+        if not isinstance(wishlist_ids, (list, tuple, set, pd.Series)):
+            wishlist_ids = [wishlist_ids]
+
+        def delete(cur):
+            cur.execute(f"DELETE FROM wishlist WHERE id {IN_IDS}", (_json_ids(wishlist_ids),))
+            return cur.rowcount
+
+        return self._write("Failed to remove from wishlist", delete)
+
+    @instrumented
+    def update_wishlist_items(self, updates):
+        """Apply edited priority, expected_price and notes for many items in one statement"""
+        rows = [(int(u['priority']), float(u['expected_price']), u['notes'] or '', int(u['id']))
+                for u in updates]
+        if not rows:
+            return 0
+
+        def update(cur):
+            cur.executemany("UPDATE wishlist SET priority = ?, expected_price = ?, notes = ? WHERE id = ?", rows)
+            return cur.rowcount
+
+        return self._write("Failed to update wishlist", update)
+
+    @instrumented
+    def get_wishlist_page(self, limit=50, offset=0, priority=None):
+        """One page of the wishlist with per-priority and total counts in the same query"""
+        query = """
+            SELECT w.*,
+                   COUNT(*) OVER (PARTITION BY priority) AS priority_count,
+                   COUNT(*) OVER () AS total_count
+            FROM wishlist w
+        """
+        params = []
+        if priority:
+            query += " WHERE priority = ?"
+            params.append(priority)
+        query += " ORDER BY priority DESC, created_at DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        try:
+            return self._read_frame(query, params)
+        except Exception as e:
+            raise Exception(f"Failed to fetch wishlist: {str(e)}")
+
+    @instrumented
+    def match_price_alerts(self, wishlist_ids=None):
+        """Record alerts for market prices below a wishlist item's expected price.
+
+        Same incremental watermark scheme as the Postgres backend.
+        """
+        def match(cur):
+            until = None
+            if wishlist_ids is None:
+                cur.execute("SELECT watermark FROM job_watermarks WHERE job = 'price_alerts'")
+                row = cur.fetchone()
+                since = row[0] if row else None
+                if since is None:
+                    cur.execute("SELECT MAX(updated_at) FROM market_values")
+                else:
+                    cur.execute("SELECT MAX(updated_at) FROM market_values WHERE updated_at > ?", (since,))
+                until = cur.fetchone()[0]
+                if until is None:
+                    return 0
+                condition = "mv.updated_at <= ?"
+                params = [until]
+                if since is not None:
+                    condition += " AND mv.updated_at > ?"
+                    params.append(since - ALERT_WATERMARK_OVERLAP)
+            else:
+                condition = f"w.id {IN_IDS}"
+                params = [_json_ids(wishlist_ids)]
+
+            cur.execute(f"""
+                INSERT INTO price_alerts (wishlist_id, market_value_id, market_price, expected_price)
+                SELECT w.id, mv.id, mv.market_price, w.expected_price
+                FROM market_values mv
+                JOIN decks d ON d.id = mv.deck_id
+                JOIN wishlist w
+                  ON normalize_name(w.deck_name) = normalize_name(d.deck_name)
+                 AND normalize_name(w.manufacturer) = normalize_name(d.manufacturer)
+                WHERE {condition}
+                  AND mv.market_price < w.expected_price
+                ON CONFLICT (wishlist_id, market_value_id) DO UPDATE SET
+                    market_price = excluded.market_price,
+                    expected_price = excluded.expected_price,
+                    dismissed = price_alerts.dismissed AND excluded.market_price >= price_alerts.market_price,
+                    created_at = {NOW}
+                WHERE price_alerts.market_price <> excluded.market_price
+                   OR price_alerts.expected_price <> excluded.expected_price
+            """, params)
+            matched = cur.rowcount
+
+            if until is not None:
+                cur.execute("""
+                    INSERT INTO job_watermarks (job, watermark) VALUES ('price_alerts', ?)
+                    ON CONFLICT (job) DO UPDATE SET watermark = excluded.watermark
+                """, (until,))
+            return matched
+
+        return self._write("Failed to match price alerts", match, bulk=True)
+
+    @instrumented
+    def get_price_alerts(self):
+        """Undismissed alerts whose market price is still below the expected price"""
+        try:
+            return self._read_frame("""
+                SELECT pa.id, pa.wishlist_id, w.deck_name, w.manufacturer, w.expected_price,
+                       mv.market_price, mv.source, mv.condition, mv.updated_at
+                FROM price_alerts pa
+                JOIN wishlist w ON w.id = pa.wishlist_id
+                JOIN market_values mv ON mv.id = pa.market_value_id
+                WHERE NOT pa.dismissed AND mv.market_price < w.expected_price
+                ORDER BY w.expected_price - mv.market_price DESC
+            """)
+        except Exception as e:
+            raise Exception(f"Failed to fetch price alerts: {str(e)}")
+
+    @instrumented
+    def dismiss_price_alerts(self, alert_ids):
+        def dismiss(cur):
+            cur.execute(f"UPDATE price_alerts SET dismissed = 1 WHERE id {IN_IDS}", (_json_ids(alert_ids),))
+            return cur.rowcount
+
+        return self._write("Failed to dismiss price alerts", dismiss)
+
+    @instrumented
+    def get_all_decks(self):
+        """Every deck without its image, in compact dtypes"""
+        try:
+            return compact_frame(self._read_frame("""
+                SELECT id, deck_name, manufacturer, release_year, condition,
+                       purchase_date, purchase_price, notes, created_at
+                FROM decks
+                ORDER BY created_at DESC
+            """), DECK_FRAME_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to fetch decks: {str(e)}")
+
+    @instrumented
+    def get_deck_identities(self):
+        """Only the columns duplicate detection needs, for every deck"""
+        try:
+            return self._read_frame("SELECT id, deck_name, manufacturer FROM decks ORDER BY id")
+        except Exception as e:
+            raise Exception(f"Failed to fetch deck names: {str(e)}")
+
+    @instrumented
+    def get_wishlist(self):
+        try:
+            return compact_frame(self._read_frame("SELECT * FROM wishlist ORDER BY priority DESC, created_at DESC"),
+                                 WISHLIST_FRAME_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to fetch wishlist: {str(e)}")
+
+    @instrumented
+    def get_deck_image(self, deck_id):
+        try:
+            rows = self._fetch_dicts("SELECT image_data FROM decks WHERE id = ?", (deck_id,))
+            return rows[0]['image_data'] if rows else None
+        except Exception as e:
+            raise Exception(f"Failed to fetch deck image: {str(e)}")
+
+    @instrumented
+    def get_image_hashes(self):
+        """(id, image_phash) of every deck with a hashed image"""
+        try:
+            return self._read_frame("SELECT id, image_phash FROM decks WHERE image_phash IS NOT NULL")
+        except Exception as e:
+            raise Exception(f"Failed to fetch image hashes: {str(e)}")
+
+    def iter_images_without_hash(self, batch_size=500):
+        """Yield batches of (id, image_data) for images with no image_phash yet, skipping undecodable ones"""
+        last_id = 0
+        while True:
+            rows = self._fetch_dicts("""
+                SELECT id, image_data FROM decks
+                WHERE image_phash IS NULL AND image_data IS NOT NULL AND NOT image_hash_failed AND id > ?
+                ORDER BY id LIMIT ?
+            """, (last_id, batch_size))
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            yield [(row['id'], bytes(row['image_data'])) for row in rows]
+
+    def iter_decks(self, chunk_size=10000):
+        """get_all_decks as a stream of DataFrame chunks"""
+        return self._stream_frames("""
+            SELECT id, deck_name, manufacturer, release_year, condition,
+                   purchase_date, purchase_price, notes, created_at
+            FROM decks
+            ORDER BY created_at DESC
+        """, (), chunk_size, DECK_FRAME_SCHEMA)
+
+    def iter_market_values(self, deck_id=None, chunk_size=10000):
+        """get_market_values as a stream of DataFrame chunks"""
+        query = """
+            SELECT mv.*, d.deck_name, d.manufacturer, d.condition as deck_condition, d.purchase_price
+            FROM market_values mv
+            JOIN decks d ON mv.deck_id = d.id
+        """
+        params = []
+        if deck_id:
+            query += " WHERE mv.deck_id = ?"
+            params.append(deck_id)
+        query += " ORDER BY mv.updated_at DESC"
+        return self._stream_frames(query, params, chunk_size, MARKET_VALUE_FRAME_SCHEMA)
+
+    def iter_active_shared_collections(self, chunk_size=10000):
+        """get_active_shared_collections as a stream of DataFrame chunks"""
+        return self._stream_frames(ACTIVE_SHARES_SQL, (), chunk_size)
+
+    def iter_search_decks(self, query, batch_size=1000):
+        """search_decks as a stream of row-dict batches"""
+        for rows, columns in self._stream("""
+            SELECT * FROM decks
+            WHERE deck_name LIKE ?
+            OR manufacturer LIKE ?
+            OR notes LIKE ?
+        """, (f'%{query}%', f'%{query}%', f'%{query}%'), batch_size):
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def _stream(self, query, params, itersize):
+        """Yield (rows, column names) batches from a dedicated reader connection.
+
+        WAL mode lets the reader run alongside writes on the main connection.
+        """
+        conn = self.new_connection()
+        try:
+            with closing(conn.cursor()) as cur:
+                cur.arraysize = itersize
+                cur.execute(query, params)
+                columns = [column[0] for column in cur.description]
+                while True:
+                    rows = cur.fetchmany()
+                    if not rows:
+                        break
+                    yield rows, columns
+        finally:
+            conn.close()
+
+    def _stream_frames(self, query, params, chunk_size, schema=None):
+        for rows, columns in self._stream(query, params, chunk_size):
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            yield compact_frame(chunk, schema) if schema else chunk
+
+    @instrumented
+    def set_image_hashes(self, hashes):
+        """Store (deck_id, image_phash) pairs; a None hash marks the image undecodable"""
+        if not hashes:
+            return 0
+
+        def update(cur):
+            cur.executemany("UPDATE decks SET image_phash = ?, image_hash_failed = ? WHERE id = ?",
+                            [(image_hash, image_hash is None, deck_id) for deck_id, image_hash in hashes])
+            return cur.rowcount
+
+        updated = self._write("Failed to store image hashes", update, bulk=True)
+        self.image_hash_version += 1
+        return updated
+
+    @instrumented
+    def get_decks_by_ids(self, deck_ids):
+        """Full deck rows for the given ids, in the order given"""
+        try:
+            rows = self._fetch_dicts(f"SELECT * FROM decks WHERE id {IN_IDS}", (_json_ids(deck_ids),))
+            decks = {deck['id']: deck for deck in rows}
+            return [decks[int(i)] for i in deck_ids if int(i) in decks]
+        except Exception as e:
+            raise Exception(f"Failed to fetch decks: {str(e)}")
+
+    @instrumented
+    def search_decks(self, query):
+        try:
+            # LIKE is case-insensitive for ASCII in SQLite, matching ILIKE
+            return self._fetch_dicts("""
+                SELECT * FROM decks
+                WHERE deck_name LIKE ?
+                OR manufacturer LIKE ?
+                OR notes LIKE ?
+            """, (f'%{query}%', f'%{query}%', f'%{query}%'))
+        except Exception as e:
+            raise Exception(f"Search failed: {str(e)}")
+
+    @instrumented
+    def create_shared_collection(self, name, deck_ids, description=None, expires_at=None, is_public=False):
+        def insert(cur):
+            cur.execute("""
+                INSERT INTO shared_collections (name, description, expires_at, is_public)
+                VALUES (?, ?, ?, ?)
+            """, (name, description, expires_at, is_public))
+            collection_id = cur.lastrowid
+            cur.executemany(
+                "INSERT INTO shared_collection_decks (collection_id, deck_id, position) VALUES (?, ?, ?)",
+                [(collection_id, int(deck_id), position) for position, deck_id in enumerate(deck_ids, start=1)]
+            )
+            cur.execute("SELECT share_id FROM shared_collections WHERE id = ?", (collection_id,))
+            return cur.fetchone()[0]
+
+        return self._write("Failed to create shared collection", insert)
+
+    @instrumented
+    def get_shared_collection(self, share_id, limit=None, offset=0):
+        """A live share with deck_count and one page of its decks; limit=None returns every deck"""
+        try:
+            rows = self._fetch_dicts(f"""
+                SELECT sc.*,
+                       (SELECT COUNT(*) FROM shared_collection_decks WHERE collection_id = sc.id) AS deck_count
+                FROM shared_collections sc
+                WHERE sc.share_id = ? AND (sc.expires_at IS NULL OR sc.expires_at > {NOW})
+            """, (str(share_id),))
+            if not rows:
+                return None
+            collection = rows[0]
+            collection['decks'] = self._fetch_dicts("""
+                SELECT d.id, d.deck_name, d.manufacturer, d.release_year, d.condition,
+                       d.purchase_date, d.notes, d.created_at
+                FROM shared_collection_decks scd
+                JOIN decks d ON d.id = scd.deck_id
+                WHERE scd.collection_id = ?
+                ORDER BY scd.position
+                LIMIT ? OFFSET ?
+            """, (collection['id'], -1 if limit is None else limit, offset))
+            return collection
+        except Exception as e:
+            raise Exception(f"Failed to fetch shared collection: {str(e)}")
+
+    @instrumented
+    def get_active_shared_collections(self):
+        try:
+            return self._read_frame(ACTIVE_SHARES_SQL)
+        except Exception as e:
+            raise Exception(f"Failed to fetch shared collections: {str(e)}")
+
+    @instrumented
+    def get_shares_for_decks(self, deck_ids):
+        """Active shares containing any of deck_ids, with how many of them each holds"""
+        try:
+            return self._read_frame(f"""
+                SELECT sc.id, sc.share_id, sc.name, COUNT(*) AS matching_decks
+                FROM shared_collection_decks scd
+                JOIN shared_collections sc ON sc.id = scd.collection_id
+                WHERE scd.deck_id {IN_IDS}
+                  AND (sc.expires_at IS NULL OR sc.expires_at > {NOW})
+                GROUP BY sc.id
+                ORDER BY sc.name
+            """, (_json_ids(deck_ids),))
+        except Exception as e:
+            raise Exception(f"Failed to fetch shares for decks: {str(e)}")
+
+    @instrumented
+    def purge_expired_shares(self, batch_size=1000):
+        """Delete expired shares and their memberships, committing every batch_size shares"""
+        deleted = 0
+        while True:
+            batch = self._write("Failed to purge expired shares", lambda cur: cur.execute(f"""
+                DELETE FROM shared_collections WHERE id IN (
+                    SELECT id FROM shared_collections
+                    WHERE expires_at <= {NOW}
+                    ORDER BY id
+                    LIMIT ?
+                )
+            """, (batch_size,)).rowcount, bulk=True)
+            deleted += batch
+            if batch < batch_size:
+                return deleted
+
+    @instrumented
+    def purge_failed_migrations(self):
+        """Remove failed or abandoned migration rows so those versions can be retried"""
+        def purge(cur):
+            cur.execute("DELETE FROM schema_migrations WHERE status <> 'completed' RETURNING version")
+            return sorted(row[0] for row in cur.fetchall())
+
+        return self._write("Failed to purge migrations", purge)
+
+    @instrumented
+    def purge_dismissed_alerts(self, retention_days=30):
+        """Delete price alerts dismissed more than retention_days ago"""
+        return self._write("Failed to purge price alerts", lambda cur: cur.execute(
+            "DELETE FROM price_alerts WHERE dismissed AND created_at < datetime('now', 'localtime', ?)",
+            (f"-{int(retention_days)} days",)
+        ).rowcount, bulk=True)
+
+    def refresh_materialized_views(self):
+        """SQLite has no materialized views"""
+        return []
+
+    @instrumented
+    def vacuum_analyze(self, min_dead_tuples=1000, min_dead_ratio=0.1, max_tables=5):
+        """VACUUM the file when enough pages are free, and let PRAGMA optimize refresh statistics.
+
+        SQLite keeps no per-table dead-row counts, so free pages stand in for
+        dead rows and the whole file is the unit of work.
+        """
+        with self.lock, closing(self.conn.cursor()) as cur:
+            try:
+                free_pages = cur.execute("PRAGMA freelist_count").fetchone()[0]
+                total_pages = cur.execute("PRAGMA page_count").fetchone()[0]
+                actions = []
+                if free_pages >= min_dead_tuples and free_pages >= min_dead_ratio * max(total_pages, 1):
+                    cur.execute("VACUUM")
+                    actions.append({'table_name': '*', 'dead_rows': free_pages, 'modified_rows': None,
+                                    'action': 'vacuum'})
+                cur.execute("PRAGMA optimize")
+                actions.append({'table_name': '*', 'dead_rows': None, 'modified_rows': None, 'action': 'analyze'})
+                return actions
+            except Exception as e:
+                raise Exception(f"Failed to vacuum tables: {str(e)}")
+
+def _split_statements(script):
+    return [statement for statement in (part.strip() for part in script.split(';')) if statement]
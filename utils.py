@@ -1,10 +1,50 @@
 import io
+import os
 from PIL import Image
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import csv
 import io
 
+# 'pyarrow' stores free-text columns as Arrow strings instead of Python objects
+FRAME_DTYPE_BACKEND = os.environ.get('FRAME_DTYPE_BACKEND', 'numpy')
+
+# Column dtypes for frames loaded from the database. Repeated values become
+# categoricals, Decimal prices become float64 and dates become datetime64.
+DECK_FRAME_SCHEMA = {
+    'int': ['id', 'release_year'],
+    'float': ['purchase_price'],
+    'category': ['manufacturer', 'condition'],
+    'datetime': ['purchase_date', 'created_at'],
+    'string': ['deck_name', 'notes']
+}
+WISHLIST_FRAME_SCHEMA = {
+    'int': ['id', 'priority'],
+    'float': ['expected_price'],
+    'category': ['manufacturer'],
+    'datetime': ['created_at'],
+    'string': ['deck_name', 'notes']
+}
+MARKET_VALUE_FRAME_SCHEMA = {
+    'int': ['id', 'deck_id'],
+    'float': ['market_price', 'purchase_price'],
+    'category': ['source', 'condition', 'manufacturer', 'deck_condition'],
+    'datetime': ['updated_at'],
+    'string': ['deck_name', 'notes']
+}
+VALUATION_FRAME_SCHEMA = {
+    'int': ['deck_count', 'valued_decks'],
+    'float': ['cost_basis', 'market_value'],
+    'datetime': ['snapshot_date']
+}
+
+DECK_IMPORT_COLUMNS = ['deck_name', 'manufacturer', 'release_year', 'condition', 'purchase_date', 'purchase_price']
+MIN_RELEASE_YEAR = 1800
+MAX_REPORTED_ERRORS = 100
+# purchase_price is DECIMAL(10,2), so anything from 1e8 up overflows the column
+MAX_PURCHASE_PRICE = 1e8
+
 def validate_image(image_file, max_size_mb=5):
     try:
         # Check file size
@@ -34,6 +74,14 @@ def validate_image(image_file, max_size_mb=5):
     except Exception as e:
         return None, f"Invalid image format: {str(e)}"
 
+def compute_image_hash(image_data, hash_size=8):
+    """64-bit difference hash (dHash) of an image as a signed integer (fits a BIGINT column)"""
+    image = Image.open(io.BytesIO(image_data)).convert('L')
+    image = image.resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = np.asarray(image, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>i8')[0])
+
 def validate_deck_data(deck_data):
     current_year = datetime.now().year
     errors = []
@@ -44,13 +92,35 @@ def validate_deck_data(deck_data):
     if deck_data['purchase_price'] < 0:
         errors.append("Purchase price cannot be negative")
     
+    if not np.isfinite(deck_data['purchase_price']):
+        errors.append("Purchase price must be finite")
+    elif deck_data['purchase_price'] >= MAX_PURCHASE_PRICE:
+        errors.append(f"Purchase price must be below {MAX_PURCHASE_PRICE:,.0f}")
+    
     return errors
 
 def prepare_export_data(df):
     # Remove binary image data and system columns for export
-    export_df = df.drop(columns=['image_data', 'id', 'created_at'])
+    export_df = df.drop(columns=['image_data', 'image_phash', 'image_hash_failed', 'id', 'created_at'], errors='ignore')
     return export_df
 
+def compact_frame(df, schema):
+    """Convert a freshly loaded frame to the compact dtypes listed in schema"""
+    columns = {}
+    for column in schema.get('int', []):
+        values = pd.to_numeric(df[column])
+        columns[column] = values.astype('Int64' if values.isna().any() else 'int64')
+    for column in schema.get('float', []):
+        columns[column] = pd.to_numeric(df[column]).astype('float64')
+    for column in schema.get('category', []):
+        columns[column] = df[column].astype('category')
+    for column in schema.get('datetime', []):
+        columns[column] = pd.to_datetime(df[column])
+    if FRAME_DTYPE_BACKEND == 'pyarrow':
+        for column in schema.get('string', []):
+            columns[column] = df[column].astype('string[pyarrow]')
+    return df.assign(**columns)
+
 def parse_bulk_import_data(file):
     try:
         content = file.read().decode('utf-8')
@@ -83,3 +153,85 @@ def parse_bulk_import_data(file):
         return decks, errors
     except Exception as e:
         return [], [f"Failed to parse CSV file: {str(e)}"]
+
+def read_arrow_file(file):
+    """Read an Arrow IPC file (Feather) or an Arrow IPC stream into a DataFrame"""
+    magic = file.read(6)
+    file.seek(0)
+    # read_feather only handles the file format, which starts with a magic
+    # string; streams start straight with their first message
+    if magic.startswith((b'ARROW1', b'FEA1')):
+        return pd.read_feather(file)
+    import pyarrow as pa
+    with pa.ipc.open_stream(file) as reader:
+        return reader.read_pandas()
+
+def parse_columnar_import_data(file, file_format):
+    """Read a Parquet or Arrow (Feather) file and validate it column-wise"""
+    try:
+        if file_format == 'parquet':
+            df = pd.read_parquet(file)
+        else:
+            df = read_arrow_file(file)
+    except Exception as e:
+        return pd.DataFrame(columns=DECK_IMPORT_COLUMNS + ['notes']), [f"Failed to read {file_format} file: {str(e)}"]
+
+    return validate_deck_frame(df)
+
+def validate_deck_frame(df):
+    """Vectorized equivalent of validate_deck_data for a whole DataFrame of decks.
+
+    Returns the valid rows with normalized dtypes and a list of row errors
+    (capped at MAX_REPORTED_ERRORS messages).
+    """
+    missing = [column for column in DECK_IMPORT_COLUMNS if column not in df.columns]
+    if missing:
+        return pd.DataFrame(columns=DECK_IMPORT_COLUMNS + ['notes']), [f"Missing required columns: {', '.join(missing)}"]
+
+    dates = df['purchase_date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates.astype('string'), format='%Y-%m-%d', errors='coerce')
+
+    # Text cells left blank (or NA in Parquet/Arrow) become '' as in the per-row CSV path
+    decks = pd.DataFrame({
+        'deck_name': df['deck_name'].astype('string').str.strip().fillna(''),
+        'manufacturer': df['manufacturer'].astype('string').str.strip().fillna(''),
+        'release_year': pd.to_numeric(df['release_year'], errors='coerce'),
+        'condition': df['condition'].astype('string').str.strip().fillna(''),
+        'purchase_date': dates,
+        'purchase_price': pd.to_numeric(df['purchase_price'], errors='coerce'),
+        'notes': df['notes'].astype('string').str.strip().fillna('') if 'notes' in df.columns else '',
+    })
+
+    current_year = datetime.now().year
+    years = decks['release_year'].to_numpy(dtype=float, na_value=np.nan)
+    prices = decks['purchase_price'].to_numpy(dtype=float, na_value=np.nan)
+    checks = [
+        (decks['deck_name'].eq('').to_numpy(dtype=bool), "Deck name is required"),
+        (decks['manufacturer'].eq('').to_numpy(dtype=bool), "Manufacturer is required"),
+        (np.isnan(years) | (np.mod(years, 1) != 0), "Release year must be a whole number"),
+        (years > current_year, f"Release year cannot be in the future (current year: {current_year})"),
+        (years < MIN_RELEASE_YEAR, f"Release year cannot be before {MIN_RELEASE_YEAR}"),
+        (decks['purchase_date'].isna().to_numpy(dtype=bool), "Purchase date must be a date (YYYY-MM-DD)"),
+        (np.isnan(prices), "Purchase price must be a number"),
+        (prices < 0, "Purchase price cannot be negative"),
+        (np.isinf(prices), "Purchase price must be finite"),
+        (np.isfinite(prices) & (prices >= MAX_PURCHASE_PRICE), f"Purchase price must be below {MAX_PURCHASE_PRICE:,.0f}"),
+    ]
+
+    invalid = np.zeros(len(decks), dtype=bool)
+    for mask, _ in checks:
+        invalid |= mask
+
+    errors = []
+    invalid_rows = np.flatnonzero(invalid)
+    for pos in invalid_rows[:MAX_REPORTED_ERRORS]:
+        messages = [message for mask, message in checks if mask[pos]]
+        errors.append(f"Row {pos + 1}: {', '.join(messages)}")
+    if len(invalid_rows) > MAX_REPORTED_ERRORS:
+        errors.append(f"... and {len(invalid_rows) - MAX_REPORTED_ERRORS} more invalid rows")
+
+    decks = decks[~invalid].reset_index(drop=True)
+    decks['release_year'] = decks['release_year'].astype('int64')
+    decks['purchase_price'] = decks['purchase_price'].astype('float64')
+    return decks, errors